@@ -0,0 +1,29 @@
+"""Add composite indexes for order exports
+
+Revision ID: 002_order_export_indexes
+Revises: 001_initial_schema
+Create Date: 2026-10-15 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_order_export_indexes'
+down_revision = '001_initial_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_orders_date_created', 'orders', [sa.text('order_date DESC'), sa.text('created_at DESC')], unique=False)
+    op.create_index('ix_orders_customer_date', 'orders', ['customer_id', sa.text('order_date DESC')], unique=False)
+    op.create_index('ix_orders_group_date', 'orders', ['group_id', sa.text('order_date DESC')], unique=False)
+    op.create_index('ix_orders_status_date', 'orders', ['status', sa.text('order_date DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_status_date', table_name='orders')
+    op.drop_index('ix_orders_group_date', table_name='orders')
+    op.drop_index('ix_orders_customer_date', table_name='orders')
+    op.drop_index('ix_orders_date_created', table_name='orders')
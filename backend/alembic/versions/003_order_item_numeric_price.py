@@ -0,0 +1,52 @@
+"""Store order item prices as NUMERIC(12, 2)
+
+Revision ID: 003_order_item_numeric_price
+Revises: 002_order_export_indexes
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_order_item_numeric_price'
+down_revision = '002_order_export_indexes'
+branch_labels = None
+depends_on = None
+
+
+# Same rule as app.pricing.parse_price: drop currency words, currency symbols
+# and thousands separators, then take the first number ('Rs. 50' -> 50.00)
+_PRICE = (
+    "ROUND(CAST(substring("
+    "regexp_replace(unit_price, 'rs\\.?|inr|rupees?|[₹$,]', '', 'gi') "
+    "FROM '[0-9]+(?:\\.[0-9]+)?'"
+    ") AS NUMERIC), 2)"
+)
+
+
+def upgrade() -> None:
+    # Existing values like '₹1,299' are parsed during the cast; anything with
+    # no number, or too large for NUMERIC(12, 2), becomes NULL
+    with op.batch_alter_table('order_items') as batch_op:
+        batch_op.alter_column(
+            'unit_price',
+            existing_type=sa.String(length=50),
+            type_=sa.Numeric(precision=12, scale=2),
+            existing_nullable=True,
+            postgresql_using=(
+                f"CASE WHEN {_PRICE} < 10000000000 "
+                f"THEN CAST({_PRICE} AS NUMERIC(12, 2)) END"
+            )
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('order_items') as batch_op:
+        batch_op.alter_column(
+            'unit_price',
+            existing_type=sa.Numeric(precision=12, scale=2),
+            type_=sa.String(length=50),
+            existing_nullable=True,
+            postgresql_using="unit_price::text"
+        )
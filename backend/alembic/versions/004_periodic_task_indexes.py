@@ -0,0 +1,31 @@
+"""Add indexes for periodic order and message tasks
+
+Revision ID: 004_periodic_task_indexes
+Revises: 003_order_item_numeric_price
+Create Date: 2026-10-15 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_periodic_task_indexes'
+down_revision = '003_order_item_numeric_price'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_msgs_reproc', 'whatsapp_messages', ['is_processed', 'is_order', 'created_at'], unique=False)
+    op.create_index('ix_orders_customer_pending', 'orders', ['customer_id', 'status', 'created_at'], unique=False)
+    op.create_index(
+        'ix_orders_pending_created', 'orders', ['status', 'created_at'], unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+        sqlite_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_pending_created', table_name='orders')
+    op.drop_index('ix_orders_customer_pending', table_name='orders')
+    op.drop_index('ix_msgs_reproc', table_name='whatsapp_messages')
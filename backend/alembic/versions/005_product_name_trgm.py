@@ -0,0 +1,33 @@
+"""Add trigram index for product name matching
+
+Revision ID: 005_product_name_trgm
+Revises: 004_periodic_task_indexes
+Create Date: 2026-10-15 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_product_name_trgm'
+down_revision = '004_periodic_task_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # pg_trgm is PostgreSQL-only; SQLite keeps matching with LIKE
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_products_name_trgm', 'products', ['name'], unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_products_name_trgm', table_name='products')
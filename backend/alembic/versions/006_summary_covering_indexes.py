@@ -0,0 +1,32 @@
+"""Add covering indexes for summary aggregates
+
+Revision ID: 006_summary_covering_indexes
+Revises: 005_product_name_trgm
+Create Date: 2026-10-15 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_summary_covering_indexes'
+down_revision = '005_product_name_trgm'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ix_orders_customer_date (customer_id, order_date DESC) already exists from 002
+    op.create_index(
+        'ix_orders_date_group', 'orders', ['order_date', 'group_id'], unique=False,
+        postgresql_include=['customer_id', 'id']
+    )
+    op.create_index(
+        'ix_order_items_order_product', 'order_items', ['order_id', 'product_name'], unique=False,
+        postgresql_include=['quantity']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_order_items_order_product', table_name='order_items')
+    op.drop_index('ix_orders_date_group', table_name='orders')
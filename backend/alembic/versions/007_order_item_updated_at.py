@@ -0,0 +1,26 @@
+"""Track order item updates
+
+Revision ID: 007_order_item_updated_at
+Revises: 006_summary_covering_indexes
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_order_item_updated_at'
+down_revision = '006_summary_covering_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Daily summary cache keys include the latest item update, so an item
+    # edit that leaves its order untouched still invalidates the summary
+    op.add_column('order_items', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE order_items SET updated_at = created_at")
+
+
+def downgrade() -> None:
+    op.drop_column('order_items', 'updated_at')
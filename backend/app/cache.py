@@ -0,0 +1,47 @@
+"""
+Redis cache client shared by API handlers and Celery tasks
+"""
+import logging
+import os
+from typing import Optional
+
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Redis URL
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Get the process-wide Redis client (created on first use)"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            REDIS_URL,
+            socket_timeout=1,
+            socket_connect_timeout=1
+        )
+    return _redis_client
+
+
+def cache_get(key: str) -> Optional[bytes]:
+    """Read a cached value, treating Redis errors as a cache miss"""
+    try:
+        return get_redis().get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return None
+
+
+def cache_set(key: str, value, ttl: int) -> None:
+    """Store a value with an expiry, ignoring Redis errors"""
+    try:
+        get_redis().setex(key, ttl, value)
+    except redis.RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
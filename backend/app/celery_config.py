@@ -3,8 +3,11 @@ Celery configuration for WhatsApp Order Backend
 """
 import os
 from celery import Celery
+from celery.signals import task_postrun, worker_process_init
 from dotenv import load_dotenv
 
+from app.database import TaskSession, engine, warm_pool
+
 load_dotenv()
 
 # Configure Celery
@@ -16,7 +19,8 @@ celery_app = Celery(
         "app.tasks.message_processor",
         "app.tasks.order_processor", 
         "app.tasks.summary_generator",
-        "app.tasks.export_generator"
+        "app.tasks.export_generator",
+        "app.tasks.whatsapp_bot"
     ]
 )
 
@@ -30,6 +34,9 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
+    # Acknowledge after completion so a long export cannot hold
+    # prefetched short tasks hostage on a busy worker
+    task_acks_late=True,
     worker_prefetch_multiplier=1,
     result_expires=3600,  # 1 hour
     # Task routing
@@ -38,6 +45,7 @@ celery_app.conf.update(
         "app.tasks.order_processor.*": {"queue": "orders"},
         "app.tasks.summary_generator.*": {"queue": "summaries"},
         "app.tasks.export_generator.*": {"queue": "exports"},
+        "app.tasks.whatsapp_bot.*": {"queue": "whatsapp"},
     },
     # Rate limiting
     task_annotations={
@@ -45,3 +53,17 @@ celery_app.conf.update(
         "app.tasks.export_generator.generate_export": {"rate_limit": "5/m"},
     }
 )
+
+
+@worker_process_init.connect
+def _reset_db_pool(**kwargs):
+    """Drop pooled connections inherited from the parent across fork, then
+    open this child's own before it takes tasks"""
+    engine.dispose(close=False)
+    warm_pool()
+
+
+@task_postrun.connect
+def _remove_task_session(**kwargs):
+    """Return the task's session connection to the pool once it finishes"""
+    TaskSession.remove()
@@ -1,30 +1,68 @@
-from sqlalchemy import create_engine, MetaData
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, MetaData, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
+import logging
 import os
+import threading
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Database URL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./whatsapp_orders.db")
 
+# JSON columns (summary_data, extracted_data) are encoded with orjson,
+# which is several times faster than the stdlib encoder on large payloads
+def _json_serializer(value):
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
 # Create engine
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
         DATABASE_URL, 
-        connect_args={"check_same_thread": False}
+        connect_args={"check_same_thread": False},
+        insertmanyvalues_page_size=1000,
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads
     )
 else:
-    engine = create_engine(DATABASE_URL)
+    # Pool per process; size it to the worker concurrency it serves
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # Recycle before server/firewall idle timeouts silently drop connections
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        pool_pre_ping=True,
+        insertmanyvalues_page_size=1000,
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads
+    )
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Session reused across Celery tasks in the same worker thread/greenlet;
+# released after each task by the task_postrun handler in celery_config
+TaskSession = scoped_session(SessionLocal)
+
 # Create Base class
 Base = declarative_base()
 metadata = MetaData()
 
+# Dialect-specific INSERT supporting on_conflict_do_nothing()/do_update()
+def upsert_insert(table):
+    if engine.dialect.name == "postgresql":
+        return pg_insert(table)
+    return sqlite_insert(table)
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -33,6 +71,51 @@ def get_db():
     finally:
         db.close()
 
+# Open the pool's connections up front, in parallel (drivers release the GIL
+# while connecting), so the first requests don't each pay a handshake
+def warm_pool():
+    pool_size = engine.pool.size() if hasattr(engine.pool, "size") else 0
+    if not pool_size:
+        return
+
+    # Each connection is held until all are open, so the pool can't hand one
+    # connection back out and the warm-up ends with pool_size distinct ones
+    barrier = threading.Barrier(pool_size)
+
+    def open_connection(_):
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                barrier.wait(timeout=30)
+        except threading.BrokenBarrierError:
+            pass
+        except Exception as e:
+            barrier.abort()
+            logger.warning(f"Database pool warm-up failed: {e}")
+
+    with ThreadPoolExecutor(max_workers=pool_size) as executor:
+        list(executor.map(open_connection, range(pool_size)))
+
+# True if the database is stamped with the newest Alembic revision; False when
+# it is behind or not managed by Alembic at all (no alembic_version table)
+def schema_up_to_date():
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    from sqlalchemy.exc import SQLAlchemyError
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(backend_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(backend_dir, "alembic"))
+    expected_rev = ScriptDirectory.from_config(config).get_current_head()
+
+    try:
+        with engine.connect() as connection:
+            current_rev = connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except SQLAlchemyError:
+        return False
+
+    return current_rev == expected_rev
+
 # Database connection test
 def test_connection():
     try:
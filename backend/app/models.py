@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON, Index, Numeric
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -83,6 +83,33 @@ class Order(Base):
     group = relationship("WhatsAppGroup", back_populates="orders")
     order_items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+# Composite indexes matching the export filters and its
+# ORDER BY order_date DESC, created_at DESC
+Index("ix_orders_date_created", Order.order_date.desc(), Order.created_at.desc())
+Index("ix_orders_customer_date", Order.customer_id, Order.order_date.desc())
+Index("ix_orders_group_date", Order.group_id, Order.order_date.desc())
+Index("ix_orders_status_date", Order.status, Order.order_date.desc())
+
+# Predicates of the periodic order tasks: merge_duplicate_orders and
+# auto_complete_pending_orders (partial, only pending rows are indexed)
+Index("ix_orders_customer_pending", Order.customer_id, Order.status, Order.created_at)
+Index(
+    "ix_orders_pending_created",
+    Order.status,
+    Order.created_at,
+    postgresql_where=Order.status == "pending",
+    sqlite_where=Order.status == "pending"
+)
+
+# Summary tasks filter on order_date (and group_id) and aggregate items per
+# order; INCLUDE columns let PostgreSQL answer them with index-only scans
+Index(
+    "ix_orders_date_group",
+    Order.order_date,
+    Order.group_id,
+    postgresql_include=["customer_id", "id"]
+)
+
 class OrderItem(Base):
     __tablename__ = "order_items"
     
@@ -91,14 +118,22 @@ class OrderItem(Base):
     product_id = Column(Integer, ForeignKey("products.id"))
     product_name = Column(String(200), nullable=False)  # Store name even if product not in DB
     quantity = Column(Integer, nullable=False)
-    unit_price = Column(String(50))
+    unit_price = Column(Numeric(12, 2))
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     order = relationship("Order", back_populates="order_items")
     product = relationship("Product", back_populates="order_items")
 
+Index(
+    "ix_order_items_order_product",
+    OrderItem.order_id,
+    OrderItem.product_name,
+    postgresql_include=["quantity"]
+)
+
 class WhatsAppMessage(Base):
     __tablename__ = "whatsapp_messages"
     
@@ -115,6 +150,14 @@ class WhatsAppMessage(Base):
     extracted_data = Column(JSON)  # Store parsed order data
     created_at = Column(DateTime, default=datetime.utcnow)
 
+# reprocess_failed_messages filters on all three
+Index(
+    "ix_msgs_reproc",
+    WhatsAppMessage.is_processed,
+    WhatsAppMessage.is_order,
+    WhatsAppMessage.created_at
+)
+
 class OrderSummary(Base):
     __tablename__ = "order_summaries"
     
@@ -0,0 +1,39 @@
+"""
+Price parsing shared by the API and Celery tasks
+"""
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Optional
+
+# A price is the first number left once currency words, currency symbols and
+# thousands separators are removed: 'Rs. 50' -> 50, '₹1,299' -> 1299.
+# Migration 003 applies the same rule in SQL.
+_PRICE_STRIP_RE = re.compile(r'rs\.?|inr|rupees?|[₹$,]', re.IGNORECASE)
+_PRICE_NUMBER_RE = re.compile(r'[0-9]+(?:\.[0-9]+)?')
+
+# order_items.unit_price is NUMERIC(12, 2)
+_PRICE_STEP = Decimal("0.01")
+_PRICE_LIMIT = Decimal("1e10")
+
+
+def parse_price(value) -> Optional[Decimal]:
+    """Parse a price such as '₹1,299' into a Decimal rounded to paise, or None
+    if it is not a price that fits the column"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (Decimal, int, float)):
+        try:
+            price = Decimal(str(value))
+        except InvalidOperation:
+            return None
+    else:
+        match = _PRICE_NUMBER_RE.search(_PRICE_STRIP_RE.sub('', str(value)))
+        if match is None:
+            return None
+        price = Decimal(match.group())
+
+    # Rejects NaN and Infinity, and anything the column cannot hold
+    if not price.is_finite() or price < 0 or price >= _PRICE_LIMIT:
+        return None
+    price = price.quantize(_PRICE_STEP, rounding=ROUND_HALF_UP)
+    return price if price < _PRICE_LIMIT else None
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from collections import defaultdict
@@ -251,29 +252,23 @@ async def get_group_summary(db: Session = Depends(get_db)):
         group_summaries = []
         
         for group in groups:
-            # Get orders for this group
-            orders = db.query(Order).filter(Order.group_id == group.id).all()
+            # Calculate group statistics in the database
+            total_orders, unique_customers, latest_order_date = db.query(
+                func.count(Order.id),
+                func.count(func.distinct(Order.customer_id)),
+                func.max(Order.order_date)
+            ).filter(Order.group_id == group.id).one()
             
-            if not orders:
+            if not total_orders:
                 continue
             
-            # Calculate group statistics
-            total_orders = len(orders)
-            unique_customers = len(set(order.customer_id for order in orders))
-            
             # Get total items
-            total_items = db.query(OrderItem).join(Order).filter(
-                Order.group_id == group.id
-            ).count()
-            
-            total_quantity = db.query(db.func.sum(OrderItem.quantity)).join(Order).filter(
-                Order.group_id == group.id
-            ).scalar() or 0
-            
-            # Most recent order
-            latest_order = db.query(Order).filter(
+            total_items, total_quantity = db.query(
+                func.count(OrderItem.id),
+                func.coalesce(func.sum(OrderItem.quantity), 0)
+            ).join(Order).filter(
                 Order.group_id == group.id
-            ).order_by(Order.order_date.desc()).first()
+            ).one()
             
             group_summaries.append({
                 "group_id": group.id,
@@ -282,7 +277,7 @@ async def get_group_summary(db: Session = Depends(get_db)):
                 "unique_customers": unique_customers,
                 "total_items": total_items,
                 "total_quantity": int(total_quantity),
-                "latest_order_date": latest_order.order_date.isoformat() if latest_order else None,
+                "latest_order_date": latest_order_date.isoformat() if latest_order_date else None,
                 "is_active": group.is_active
             })
         
@@ -1,40 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import asyncio
 import json
 import os
-from app.tasks.message_processor import process_whatsapp_message, bulk_process_messages
+from app.tasks.message_processor import (
+    process_whatsapp_message, process_message_batch, bulk_process_messages
+)
 from datetime import datetime
 import hmac
 import hashlib
 
 from app.database import get_db
-from app.models import WhatsAppGroup, WhatsAppMessage, Order, Customer, OrderItem
+from app.models import WhatsAppGroup, WhatsAppMessage
 from app.schemas import (
     WhatsAppGroup as WhatsAppGroupSchema,
     WhatsAppGroupCreate,
     WhatsAppMessage as WhatsAppMessageSchema,
     ApiResponse
 )
-from app.whatsapp.bot import WhatsAppBot
+from app.tasks import whatsapp_bot as bot_tasks
 
 router = APIRouter()
 
-# Global bot instance
-whatsapp_bot = None
-
-def get_whatsapp_bot():
-    global whatsapp_bot
-    if whatsapp_bot is None:
-        whatsapp_bot = WhatsAppBot()
-    return whatsapp_bot
+async def call_bot(task, *args, **kwargs):
+    """Run a bot task on the WhatsApp worker and wait for its result"""
+    # The bot and its Chrome session live in one Celery worker shared by
+    # every API process; wait off the event loop
+    result = task.apply_async(args=args, kwargs=kwargs)
+    return await asyncio.to_thread(result.get, timeout=bot_tasks.BOT_CALL_TIMEOUT + 10)
 
 @router.post("/connect")
 async def connect_whatsapp():
     """Connect to WhatsApp Web"""
     try:
-        bot = get_whatsapp_bot()
-        success = await bot.connect()
+        success = await call_bot(bot_tasks.connect)
         
         if success:
             return ApiResponse(
@@ -55,14 +55,10 @@ async def connect_whatsapp():
 async def get_whatsapp_status():
     """Get WhatsApp connection status"""
     try:
-        bot = get_whatsapp_bot()
         return ApiResponse(
             success=True,
             message="WhatsApp status retrieved",
-            data={
-                "connected": bot.is_connected,
-                "current_group": bot.current_group
-            }
+            data=await call_bot(bot_tasks.get_status)
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -71,10 +67,10 @@ async def get_whatsapp_status():
 async def get_groups(db: Session = Depends(get_db)):
     """Get available WhatsApp groups"""
     try:
-        bot = get_whatsapp_bot()
+        status = await call_bot(bot_tasks.get_status)
         
-        if not bot.is_connected:
-            success = await bot.connect()
+        if not status["connected"]:
+            success = await call_bot(bot_tasks.connect)
             if not success:
                 raise HTTPException(
                     status_code=400, 
@@ -82,7 +78,7 @@ async def get_groups(db: Session = Depends(get_db)):
                 )
         
         # Get groups from WhatsApp
-        whatsapp_groups = await bot.get_groups()
+        whatsapp_groups = await call_bot(bot_tasks.get_groups)
         
         # Store/update groups in database
         db_groups = []
@@ -127,8 +123,7 @@ async def select_group(group_id: int, db: Session = Depends(get_db)):
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
-        bot = get_whatsapp_bot()
-        success = await bot.select_group(group.group_name)
+        success = await call_bot(bot_tasks.select_group, group.group_name)
         
         if success:
             return ApiResponse(
@@ -149,23 +144,19 @@ async def select_group(group_id: int, db: Session = Depends(get_db)):
 async def get_group_messages(
     group_id: int, 
     limit: int = 50,
+    since_id: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get recent messages from a WhatsApp group"""
+    """Get recent messages from a WhatsApp group; pass the last message id
+    seen as since_id to get only newer ones"""
     try:
         # Get group from database
         group = db.query(WhatsAppGroup).filter(WhatsAppGroup.id == group_id).first()
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
-        bot = get_whatsapp_bot()
-        
-        # Select group if not already selected
-        if bot.current_group != group.group_name:
-            await bot.select_group(group.group_name)
-        
-        # Get messages from WhatsApp
-        messages = await bot.get_messages(limit=limit)
+        # Get messages from WhatsApp (the bot selects the group if needed)
+        messages = await call_bot(bot_tasks.get_messages, group.group_name, limit, since_id)
         
         # Store messages in database
         db_messages = []
@@ -182,7 +173,7 @@ async def get_group_messages(
                     sender_id=msg["sender"],
                     sender_name=msg["sender"],
                     message_content=msg["content"],
-                    timestamp=msg["datetime"],
+                    timestamp=datetime.fromtimestamp(msg["ts"]),
                     is_order=msg["is_order"],
                     extracted_data=msg.get("order_data")
                 )
@@ -218,8 +209,7 @@ async def export_group_chat(
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
-        bot = get_whatsapp_bot()
-        export_path = await bot.export_chat(group.group_name, days=days)
+        export_path = await call_bot(bot_tasks.export_chat, group.group_name, days)
         
         if export_path:
             return ApiResponse(
@@ -243,7 +233,6 @@ async def export_group_chat(
 @router.post("/groups/{group_id}/start-monitoring")
 async def start_monitoring_group(
     group_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Start monitoring a WhatsApp group for new orders"""
@@ -253,22 +242,9 @@ async def start_monitoring_group(
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
-        bot = get_whatsapp_bot()
-        
-        # Define callback for new order messages
-        async def order_callback(message):
-            try:
-                # Process new order message
-                await process_order_message(message, group, db)
-            except Exception as e:
-                print(f"Error processing order message: {e}")
-        
-        # Start monitoring in background
-        background_tasks.add_task(
-            bot.start_monitoring, 
-            group.group_name, 
-            order_callback
-        )
+        # Monitoring runs on the bot worker; order messages it sees are
+        # queued to process_whatsapp_message
+        await call_bot(bot_tasks.start_monitoring, group.group_name, group.group_id)
         
         return ApiResponse(
             success=True,
@@ -279,68 +255,11 @@ async def start_monitoring_group(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def process_order_message(message: dict, group: WhatsAppGroup, db: Session):
-    """Process a new order message and create order in database"""
-    try:
-        if not message.get("is_order") or not message.get("order_data"):
-            return
-        
-        order_data = message["order_data"]
-        
-        # Get or create customer
-        customer = db.query(Customer).filter(
-            Customer.name == order_data["customer_name"]
-        ).first()
-        
-        if not customer:
-            customer = Customer(
-                name=order_data["customer_name"],
-                phone_number="",  # Will be updated when available
-                whatsapp_id=message["sender"]
-            )
-            db.add(customer)
-            db.commit()
-            db.refresh(customer)
-        
-        # Create order
-        new_order = Order(
-            customer_id=customer.id,
-            group_id=group.id,
-            message_id=message["id"],
-            order_time=message["timestamp"],
-            raw_message=message["content"],
-            status="pending"
-        )
-        db.add(new_order)
-        db.commit()
-        db.refresh(new_order)
-        
-        # Create order items
-        for item_data in order_data.get("items", []):
-            order_item = OrderItem(
-                order_id=new_order.id,
-                product_name=item_data["item"],
-                quantity=item_data["quantity"]
-            )
-            db.add(order_item)
-        
-        # Update customer total orders
-        customer.total_orders += 1
-        
-        db.commit()
-        
-        print(f"✅ Processed order from {customer.name}: {len(order_data.get('items', []))} items")
-        
-    except Exception as e:
-        print(f"❌ Error processing order message: {e}")
-        db.rollback()
-
 @router.post("/disconnect")
 async def disconnect_whatsapp():
     """Disconnect from WhatsApp Web"""
     try:
-        bot = get_whatsapp_bot()
-        await bot.close()
+        await call_bot(bot_tasks.disconnect)
         
         return ApiResponse(
             success=True,
@@ -421,8 +340,9 @@ async def whatsapp_webhook(
                 }
             )
         else:
-            # Single message processing
-            task_result = process_whatsapp_message.delay(message_data)
+            # Single message processing; buffered with other incoming
+            # messages and written in one transaction
+            task_result = process_message_batch.delay(message_data)
             
             return ApiResponse(
                 success=True,
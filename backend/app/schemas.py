@@ -1,8 +1,11 @@
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from decimal import Decimal
 from enum import Enum
 
+from app.pricing import parse_price
+
 # Enums
 class OrderStatus(str, Enum):
     pending = "pending"
@@ -71,9 +74,13 @@ class Product(ProductBase):
 class OrderItemBase(BaseModel):
     product_name: str = Field(..., min_length=1, max_length=200)
     quantity: int = Field(..., ge=1)
-    unit_price: Optional[str] = None
+    unit_price: Optional[Decimal] = None
     notes: Optional[str] = None
 
+    @validator("unit_price", pre=True)
+    def parse_unit_price(cls, v):
+        return parse_price(v)
+
 class OrderItemCreate(OrderItemBase):
     product_id: Optional[int] = None
 
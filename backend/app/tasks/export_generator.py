@@ -1,23 +1,61 @@
 """
 Export generation tasks for Celery
 """
+import csv
 import logging
 import os
+from itertools import chain, islice
+from operator import attrgetter
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 import pandas as pd
-from celery import current_task
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle, PatternFill
+from sqlalchemy.orm import contains_eager, selectinload
 
 from app.celery_config import celery_app
-from app.database import SessionLocal
+from app.database import TaskSession
 from app.models import Order, Customer, OrderItem, WhatsAppGroup
 
 logger = logging.getLogger(__name__)
 
+BASE_EXPORT_HEADERS = (
+    "Order ID",
+    "Customer Name",
+    "Customer Phone",
+    "Group Name",
+    "Order Date",
+    "Order Time",
+    "Status",
+    "Notes"
+)
+ITEM_EXPORT_HEADERS = ("Product Name", "Quantity", "Unit Price", "Item Notes")
+SUMMARY_EXPORT_HEADERS = ("Total Items", "Items Summary")
+
+HEADER_STYLE = "export_header"
+
+# Orders fetched per round trip while streaming, and rows per DataFrame
+# chunk when the PDF path still needs a frame
+EXPORT_BATCH_SIZE = 500
+PDF_FRAME_CHUNK_SIZE = 10000
+
+# Attribute paths for BASE_EXPORT_HEADERS, resolved in C per order
+_order_row_getter = attrgetter(
+    "id",
+    "customer.name",
+    "customer.phone_number",
+    "group.group_name",
+    "order_date",
+    "order_time",
+    "status",
+    "notes"
+)
+
 
 def get_db_session():
     """Get database session for Celery tasks"""
-    return SessionLocal()
+    return TaskSession()
 
 
 @celery_app.task(
@@ -29,10 +67,6 @@ def generate_export(self, export_config: dict):
     db = get_db_session()
     try:
         export_format = export_config.get("format", "excel")
-        current_task.update_state(
-            state='PROCESSING',
-            meta={'step': f'Generating {export_format} export'}
-        )
 
         # Build query based on filters
         query = db.query(Order).join(Customer).join(WhatsAppGroup)
@@ -53,106 +87,81 @@ def generate_export(self, export_config: dict):
         if export_config.get("status"):
             query = query.filter(Order.status == export_config["status"])
 
-        orders = query.order_by(Order.order_date.desc(), Order.created_at.desc()).all()
-
-        if not orders:
+        query = query.options(
+            contains_eager(Order.customer),
+            contains_eager(Order.group),
+            selectinload(Order.order_items)
+        ).order_by(Order.order_date.desc(), Order.created_at.desc())
+
+        # Rows are produced lazily, one ORM batch at a time, so peak memory
+        # stays bounded regardless of how many orders match
+        include_items = export_config.get("include_items", True)
+        headers = list(BASE_EXPORT_HEADERS)
+        headers.extend(ITEM_EXPORT_HEADERS if include_items else SUMMARY_EXPORT_HEADERS)
+        stats = {"records": 0, "orders": 0, "customers": set(), "items": 0}
+        rows = _iter_export_rows(query.yield_per(EXPORT_BATCH_SIZE), include_items, stats)
+
+        # Orders with no items still export, as an empty sheet
+        first_row = next(rows, None)
+        if first_row is None and not stats["orders"]:
             return {
                 "success": False,
                 "message": "No orders found matching the criteria"
             }
-
-        current_task.update_state(
-            state='PROCESSING',
-            meta={'step': 'Preparing data for export'}
-        )
-
-        # Prepare data for export
-        export_data = []
-        
-        for order in orders:
-            base_row = {
-                "Order ID": order.id,
-                "Customer Name": order.customer.name,
-                "Customer Phone": order.customer.phone_number,
-                "Group Name": order.group.group_name,
-                "Order Date": order.order_date.strftime("%Y-%m-%d"),
-                "Order Time": order.order_time,
-                "Status": order.status,
-                "Notes": order.notes or ""
-            }
-
-            if export_config.get("include_items", True):
-                # Include detailed items
-                for item in order.order_items:
-                    row = base_row.copy()
-                    row.update({
-                        "Product Name": item.product_name,
-                        "Quantity": item.quantity,
-                        "Unit Price": item.unit_price or "",
-                        "Item Notes": item.notes or ""
-                    })
-                    export_data.append(row)
-            else:
-                # Summary only
-                total_items = sum(item.quantity for item in order.order_items)
-                items_list = ", ".join([f"{item.product_name} ({item.quantity})" for item in order.order_items])
-                
-                base_row.update({
-                    "Total Items": total_items,
-                    "Items Summary": items_list
-                })
-                export_data.append(base_row)
-
-        # Create DataFrame
-        df = pd.DataFrame(export_data)
+        if first_row is not None:
+            rows = chain((first_row,), rows)
 
         # Generate filename
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         export_dir = "exports"
         os.makedirs(export_dir, exist_ok=True)
 
-        current_task.update_state(
-            state='PROCESSING',
-            meta={'step': f'Saving {export_format} file'}
-        )
-
         if export_format.lower() == "excel":
             filename = f"orders_export_{timestamp}.xlsx"
             filepath = os.path.join(export_dir, filename)
             
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Orders', index=False)
-                
-                # Add summary sheet
-                summary_data = {
-                    "Metric": [
-                        "Total Orders",
-                        "Total Customers", 
-                        "Total Items",
-                        "Export Date",
-                        "Date Range"
-                    ],
-                    "Value": [
-                        len(set(order.id for order in orders)),
-                        len(set(order.customer_id for order in orders)),
-                        sum(sum(item.quantity for item in order.order_items) for order in orders),
-                        datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-                        f"{export_config.get('date_from', 'All')} to {export_config.get('date_to', 'All')}"
-                    ]
-                }
-                summary_df = pd.DataFrame(summary_data)
-                summary_df.to_excel(writer, sheet_name='Summary', index=False)
+            wb = _new_export_workbook()
+            ws = wb.create_sheet("Orders")
+            _append_header_row(ws, headers)
+            for row in rows:
+                ws.append(row)
+
+            # Add summary sheet
+            summary_ws = wb.create_sheet("Summary")
+            _append_header_row(summary_ws, ("Metric", "Value"))
+            summary_rows = [
+                ("Total Orders", stats["orders"]),
+                ("Total Customers", len(stats["customers"])),
+                ("Total Items", stats["items"]),
+                ("Export Date", datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")),
+                ("Date Range", f"{export_config.get('date_from', 'All')} to {export_config.get('date_to', 'All')}")
+            ]
+            for row in summary_rows:
+                summary_ws.append(row)
+
+            wb.save(filepath)
 
         elif export_format.lower() == "csv":
             filename = f"orders_export_{timestamp}.csv"
             filepath = os.path.join(export_dir, filename)
-            df.to_csv(filepath, index=False)
+            with open(filepath, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(headers)
+                writer.writerows(rows)
 
         elif export_format.lower() == "pdf":
             filename = f"orders_export_{timestamp}.pdf"
             filepath = os.path.join(export_dir, filename)
             
             # For PDF, we'll create a simplified format
+            df = pd.concat(
+                chain(
+                    (pd.DataFrame(columns=headers),),
+                    (pd.DataFrame(batch, columns=headers) for batch in _chunked(rows, PDF_FRAME_CHUNK_SIZE))
+                ),
+                ignore_index=True,
+                copy=False
+            )
             _generate_pdf_export(df, filepath, export_config)
 
         else:
@@ -167,7 +176,7 @@ def generate_export(self, export_config: dict):
             "filename": filename,
             "filepath": filepath,
             "file_size": file_size,
-            "record_count": len(export_data),
+            "record_count": stats["records"],
             "format": export_format,
             "generated_at": datetime.utcnow().isoformat()
         }
@@ -179,6 +188,75 @@ def generate_export(self, export_config: dict):
         db.close()
 
 
+def _iter_export_rows(orders: Iterable[Order], include_items: bool, stats: dict) -> Iterator[tuple]:
+    """Yield export rows for each order, tallying summary stats as they stream"""
+    for order in orders:
+        oid, cname, cphone, gname, odate, otime, status, notes = _order_row_getter(order)
+        base_values = (
+            oid,
+            cname,
+            cphone,
+            gname,
+            odate.strftime("%Y-%m-%d"),
+            otime,
+            status,
+            notes or ""
+        )
+        order_items = order.order_items
+        total_items = sum(item.quantity for item in order_items)
+
+        stats["orders"] += 1
+        stats["customers"].add(order.customer_id)
+        stats["items"] += total_items
+
+        if include_items:
+            # Include detailed items
+            for item in order_items:
+                stats["records"] += 1
+                yield base_values + (
+                    item.product_name,
+                    item.quantity,
+                    item.unit_price or "",
+                    item.notes or ""
+                )
+        else:
+            # Summary only
+            items_list = ", ".join([f"{item.product_name} ({item.quantity})" for item in order_items])
+            stats["records"] += 1
+            yield base_values + (total_items, items_list)
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Split an iterable into lists of at most size elements"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _new_export_workbook() -> Workbook:
+    """Create a write-only workbook with the shared header style registered"""
+    wb = Workbook(write_only=True)
+    wb.add_named_style(NamedStyle(
+        name=HEADER_STYLE,
+        font=Font(bold=True),
+        fill=PatternFill("solid", fgColor="CCCCCC")
+    ))
+    return wb
+
+
+def _append_header_row(ws, headers):
+    """Append a header row styled with the workbook's shared named style"""
+    cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.style = HEADER_STYLE
+        cells.append(cell)
+    ws.append(cells)
+
+
 def _generate_pdf_export(df: pd.DataFrame, filepath: str, config: dict):
     """Generate PDF export using reportlab"""
     try:
@@ -254,11 +332,6 @@ def _generate_pdf_export(df: pd.DataFrame, filepath: str, config: dict):
 def generate_summary_export(self, summary_data: dict, export_format: str = "excel"):
     """Generate export from summary data"""
     try:
-        current_task.update_state(
-            state='PROCESSING',
-            meta={'step': f'Generating summary {export_format} export'}
-        )
-
         # Create DataFrame from summary data
         customers_data = []
         for customer in summary_data.get("customers", []):
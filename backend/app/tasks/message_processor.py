@@ -1,25 +1,62 @@
 """
 Message processing tasks for Celery
 """
+import hashlib
+import json
 import logging
 import re
+from collections import Counter
 from datetime import datetime
 from typing import Dict, List, Any, Optional
-from celery import current_task
+from cachetools import TTLCache
+from celery import current_task, group
+from celery_batches import Batches
+from sqlalchemy import bindparam, insert, or_, select, update
 
+from app.cache import cache_get, cache_set
 from app.celery_config import celery_app
-from app.database import SessionLocal
+from app.database import TaskSession, upsert_insert
 from app.models import (
     WhatsAppMessage, Order, Customer, OrderItem, WhatsAppGroup
 )
+from app.pricing import parse_price
 from app.services.ai_service_simple import extract_order_info
 
 logger = logging.getLogger(__name__)
 
+# process_message_batch flushes after this many buffered messages, or
+# after this many seconds, whichever comes first
+MESSAGE_BATCH_SIZE = 100
+MESSAGE_BATCH_INTERVAL = 5
+
+# whatsapp_id -> customer id for senders seen recently by this worker.
+# Only ids are cached; the database stays the source of truth.
+_customer_id_cache = TTLCache(maxsize=10000, ttl=300)
+
+# Extraction results are keyed on message content, so repeated messages
+# ("+1", forwarded menus) skip the extractor for a day
+EXTRACTION_CACHE_TTL = 24 * 60 * 60
+
 
 def get_db_session():
     """Get database session for Celery tasks"""
-    return SessionLocal()
+    return TaskSession()
+
+
+def _extract_order_cached(message_content: str) -> dict:
+    """Extract order information, reusing cached results for identical messages"""
+    digest = hashlib.sha256(message_content.encode("utf-8")).hexdigest()
+    key = f"ai:extract:{digest}"
+
+    cached = cache_get(key)
+    if cached:
+        return json.loads(cached)
+
+    extracted_data = extract_order_info(message_content)
+    # Failed extractions carry an "error" key and should be retried
+    if "error" not in extracted_data:
+        cache_set(key, json.dumps(extracted_data), EXTRACTION_CACHE_TTL)
+    return extracted_data
 
 
 @celery_app.task(
@@ -33,64 +70,36 @@ def process_whatsapp_message(self, message_data: dict):
         msg_id = message_data.get('message_id')
         logger.info(f"Processing WhatsApp message: {msg_id}")
 
-        # Update task status
-        current_task.update_state(
-            state='PROCESSING',
-            meta={'step': 'Validating message'}
-        )
+        # Extract order information using AI before touching the database,
+        # so no connection or transaction is held open during the call
+        extracted_data = _extract_order_cached(message_data["message_content"])
+        is_order = extracted_data.get("is_order", False)
 
-        # Check if message already exists
-        existing_message = db.query(WhatsAppMessage).filter(
-            WhatsAppMessage.message_id == message_data["message_id"]
-        ).first()
-
-        if existing_message:
-            logger.info(f"Message already processed: {msg_id}")
-            return {"status": "skipped", "reason": "already_processed"}
-
-        # Create WhatsApp message record
-        timestamp = message_data["timestamp"]
-        if isinstance(timestamp, str):
-            timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-
-        whatsapp_message = WhatsAppMessage(
-            message_id=message_data["message_id"],
-            group_id=message_data["group_id"],
-            sender_id=message_data["sender_id"],
-            sender_name=message_data.get("sender_name", ""),
-            message_content=message_data["message_content"],
-            message_type=message_data.get("message_type", "text"),
-            timestamp=timestamp
-        )
+        # Message, order and items are written in one short transaction
+        with db.begin():
+            # Insert the message unless it already exists; one statement
+            # with no window between the existence check and the insert
+            whatsapp_message = db.scalars(
+                upsert_insert(WhatsAppMessage)
+                .values(
+                    **_message_values(message_data),
+                    extracted_data=extracted_data,
+                    is_order=is_order,
+                    is_processed=True
+                )
+                .on_conflict_do_nothing(index_elements=["message_id"])
+                .returning(WhatsAppMessage)
+            ).first()
 
-        db.add(whatsapp_message)
-        db.commit()
+            if whatsapp_message is None:
+                logger.info(f"Message already processed: {msg_id}")
+                return {"status": "skipped", "reason": "already_processed"}
 
-        # Update task status
-        current_task.update_state(
-            state='PROCESSING',
-            meta={'step': 'Analyzing message content'}
-        )
+            order_result = None
+            if is_order:
+                order_result = _process_order_from_message(db, whatsapp_message, extracted_data)
 
-        # Extract order information using AI
-        extracted_data = extract_order_info(message_data["message_content"])
-        
-        # Update message with extracted data
-        whatsapp_message.extracted_data = extracted_data
-        whatsapp_message.is_order = extracted_data.get("is_order", False)
-        
-        if whatsapp_message.is_order:
-            current_task.update_state(
-                state='PROCESSING',
-                meta={'step': 'Processing order information'}
-            )
-            
-            # Process the order
-            order_result = _process_order_from_message(db, whatsapp_message, extracted_data)
-            whatsapp_message.is_processed = True
-            
-            db.commit()
-            
+        if is_order:
             logger.info(f"Order processed successfully: {order_result}")
             return {
                 "status": "success",
@@ -98,16 +107,13 @@ def process_whatsapp_message(self, message_data: dict):
                 "order_created": order_result is not None,
                 "order_id": order_result.get("order_id") if order_result else None
             }
-        else:
-            whatsapp_message.is_processed = True
-            db.commit()
-            
-            logger.info(f"Message processed but no order found: {msg_id}")
-            return {
-                "status": "success",
-                "message_id": msg_id,
-                "order_created": False
-            }
+
+        logger.info(f"Message processed but no order found: {msg_id}")
+        return {
+            "status": "success",
+            "message_id": msg_id,
+            "order_created": False
+        }
 
     except Exception as e:
         db.rollback()
@@ -122,81 +128,324 @@ def process_whatsapp_message(self, message_data: dict):
         db.close()
 
 
-def _process_order_from_message(db, whatsapp_message: WhatsAppMessage, extracted_data: dict) -> Optional[dict]:
-    """Process order from extracted message data"""
+@celery_app.task(
+    base=Batches,
+    flush_every=MESSAGE_BATCH_SIZE,
+    flush_interval=MESSAGE_BATCH_INTERVAL,
+    name="app.tasks.message_processor.process_message_batch"
+)
+def process_message_batch(requests):
+    """Process buffered WhatsApp messages in a single transaction"""
+    db = get_db_session()
     try:
-        # Get or create customer
-        customer = _get_or_create_customer(
-            db, 
-            extracted_data.get("customer_name"),
-            extracted_data.get("customer_phone"),
-            whatsapp_message.sender_id
-        )
-        
-        # Get WhatsApp group
-        group = db.query(WhatsAppGroup).filter(
-            WhatsAppGroup.group_id == whatsapp_message.group_id
-        ).first()
-        
-        if not group:
-            # Create group if not exists
-            group = WhatsAppGroup(
-                group_id=whatsapp_message.group_id,
-                group_name=f"Group {whatsapp_message.group_id}",
-                is_active=True
+        messages_data = [
+            request.args[0] if request.args else request.kwargs["message_data"]
+            for request in requests
+        ]
+        logger.info(f"Processing batch of {len(messages_data)} WhatsApp messages")
+
+        # Extract every message before touching the database, so no
+        # connection or transaction is held open during the AI calls
+        new_rows = {}
+        for message_data in messages_data:
+            msg_id = message_data["message_id"]
+            if msg_id in new_rows:
+                continue
+            extracted_data = _extract_order_cached(message_data["message_content"])
+            new_rows[msg_id] = dict(
+                _message_values(message_data),
+                extracted_data=extracted_data,
+                is_order=extracted_data.get("is_order", False),
+                is_processed=True
+            )
+
+        # Messages already stored, or inserted by a concurrent batch, are
+        # skipped by ON CONFLICT and not returned
+        new_messages = {
+            m.message_id: m
+            for m in db.scalars(
+                upsert_insert(WhatsAppMessage)
+                .on_conflict_do_nothing(index_elements=["message_id"])
+                .returning(WhatsAppMessage),
+                list(new_rows.values())
             )
-            db.add(group)
-            db.commit()
-            db.refresh(group)
-
-        # Create order
-        order = Order(
-            customer_id=customer.id,
-            group_id=group.id,
-            message_id=whatsapp_message.message_id,
-            order_date=whatsapp_message.timestamp.date(),
-            order_time=whatsapp_message.timestamp.strftime("%I:%M %p"),
-            status="pending",
-            notes=extracted_data.get("notes"),
-            raw_message=whatsapp_message.message_content,
-            is_processed=True
+        }
+        order_messages = [
+            (m, m.extracted_data) for m in new_messages.values() if m.is_order
+        ]
+
+        # Resolve every referenced customer and group up front
+        customers = _resolve_batch_customers(db, order_messages)
+        groups = _resolve_batch_groups(db, [m for m, _ in order_messages])
+
+        order_results = {}
+        for whatsapp_message, extracted_data in order_messages:
+            order_results[whatsapp_message.message_id] = _process_order_from_message(
+                db,
+                whatsapp_message,
+                extracted_data,
+                customer_id=customers[whatsapp_message.sender_id].id,
+                whatsapp_group=groups[whatsapp_message.group_id],
+                update_customer_count=False
+            )
+
+        # Bump order counts with one executemany UPDATE for the batch
+        order_counts = Counter(
+            result["customer_id"] for result in order_results.values() if result
         )
-        
-        db.add(order)
-        db.commit()
-        db.refresh(order)
-
-        # Create order items
-        items = extracted_data.get("items", [])
-        for item_data in items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_name=item_data.get("name"),
-                quantity=item_data.get("quantity", 1),
-                unit_price=item_data.get("price"),
-                notes=item_data.get("notes")
+        if order_counts:
+            customers_table = Customer.__table__
+            db.execute(
+                update(customers_table)
+                .where(customers_table.c.id == bindparam("customer_pk"))
+                .values(total_orders=customers_table.c.total_orders + bindparam("delta")),
+                [{"customer_pk": cid, "delta": n} for cid, n in order_counts.items()]
             )
-            db.add(order_item)
 
-        # Update customer order count
-        customer.total_orders = db.query(Order).filter(Order.customer_id == customer.id).count()
-        
         db.commit()
 
+        for request, message_data in zip(requests, messages_data):
+            msg_id = message_data["message_id"]
+            if msg_id not in new_messages:
+                result = {"status": "skipped", "reason": "already_processed"}
+            else:
+                order_result = order_results.get(msg_id)
+                result = {
+                    "status": "success",
+                    "message_id": msg_id,
+                    "order_created": order_result is not None,
+                    "order_id": order_result.get("order_id") if order_result else None
+                }
+            celery_app.backend.mark_as_done(request.id, result, request=request)
+
+        logger.info(f"Batch processed: {len(new_messages)} new of {len(messages_data)} messages")
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error processing message batch: {str(e)}")
+        for request in requests:
+            celery_app.backend.mark_as_failure(request.id, e, request=request)
+        raise
+    finally:
+        db.close()
+
+
+def _resolve_batch_customers(db, order_messages: List[tuple]) -> Dict[str, Customer]:
+    """Map each sender id in the batch to its customer, creating missing ones in one insert"""
+    if not order_messages:
+        return {}
+
+    wa_ids = {m.sender_id for m, _ in order_messages}
+    phones = {d.get("customer_phone") for _, d in order_messages if d.get("customer_phone")}
+    by_wa_id, by_phone = _lookup_customers(db, wa_ids, phones)
+
+    # Same precedence as _get_or_create_customer_id: WhatsApp id, then phone
+    customers = {}
+    new_rows = {}
+    for whatsapp_message, extracted_data in order_messages:
+        sender_id = whatsapp_message.sender_id
+        phone = extracted_data.get("customer_phone")
+        customer = by_wa_id.get(sender_id) or (by_phone.get(phone) if phone else None)
+        if customer:
+            customers[sender_id] = customer
+        elif sender_id not in new_rows:
+            phone_number = phone or f"+{sender_id}"
+            if any(row["phone_number"] == phone_number for row in new_rows.values()):
+                phone_number = f"+{sender_id}"
+            new_rows[sender_id] = {
+                "name": extracted_data.get("customer_name") or f"Customer {sender_id}",
+                "phone_number": phone_number,
+                "whatsapp_id": sender_id,
+                "is_active": True,
+                "total_orders": 0
+            }
+
+    if new_rows:
+        # A concurrent batch may create the same sender first; skip those
+        # rows and read the winner's back instead of failing the batch
+        for customer in db.scalars(
+            upsert_insert(Customer)
+            .on_conflict_do_nothing(index_elements=["whatsapp_id"])
+            .returning(Customer),
+            list(new_rows.values())
+        ):
+            customers[customer.whatsapp_id] = customer
+
+        raced = new_rows.keys() - customers.keys()
+        if raced:
+            customers.update(_lookup_customers(db, raced, set())[0])
+
+    return customers
+
+
+def _lookup_customers(db, wa_ids: set, phones: set) -> tuple:
+    """Index the customers matching any of the WhatsApp ids or phones by each key"""
+    conditions = [Customer.whatsapp_id.in_(wa_ids)]
+    if phones:
+        conditions.append(Customer.phone_number.in_(phones))
+    by_wa_id = {}
+    by_phone = {}
+    for customer in db.scalars(select(Customer).where(or_(*conditions))):
+        if customer.whatsapp_id:
+            by_wa_id[customer.whatsapp_id] = customer
+        by_phone[customer.phone_number] = customer
+    return by_wa_id, by_phone
+
+
+def _resolve_batch_groups(db, whatsapp_messages: List[WhatsAppMessage]) -> Dict[str, WhatsAppGroup]:
+    """Map each group id in the batch to its group, creating missing ones in one insert"""
+    group_ids = {m.group_id for m in whatsapp_messages}
+    if not group_ids:
+        return {}
+
+    groups = {
+        g.group_id: g
+        for g in db.scalars(select(WhatsAppGroup).where(WhatsAppGroup.group_id.in_(group_ids)))
+    }
+
+    missing = [
+        {"group_id": group_id, "group_name": f"Group {group_id}", "is_active": True}
+        for group_id in group_ids - groups.keys()
+    ]
+    if missing:
+        for whatsapp_group in db.scalars(
+            upsert_insert(WhatsAppGroup)
+            .on_conflict_do_nothing(index_elements=["group_id"])
+            .returning(WhatsAppGroup),
+            missing
+        ):
+            groups[whatsapp_group.group_id] = whatsapp_group
+
+        # Groups a concurrent batch created first
+        raced = group_ids - groups.keys()
+        if raced:
+            for whatsapp_group in db.scalars(
+                select(WhatsAppGroup).where(WhatsAppGroup.group_id.in_(raced))
+            ):
+                groups[whatsapp_group.group_id] = whatsapp_group
+
+    return groups
+
+
+def _existing_message_ids(db, message_ids: List[str]) -> set:
+    """Return which of the given message ids are already stored"""
+    if not message_ids:
+        return set()
+    return set(db.scalars(
+        select(WhatsAppMessage.message_id).where(WhatsAppMessage.message_id.in_(message_ids))
+    ))
+
+
+def _message_values(message_data: dict) -> dict:
+    """Column values for a WhatsApp message record from incoming message data"""
+    timestamp = message_data["timestamp"]
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+    return {
+        "message_id": message_data["message_id"],
+        "group_id": message_data["group_id"],
+        "sender_id": message_data["sender_id"],
+        "sender_name": message_data.get("sender_name", ""),
+        "message_content": message_data["message_content"],
+        "message_type": message_data.get("message_type", "text"),
+        "timestamp": timestamp
+    }
+
+
+def _process_order_from_message(
+    db,
+    whatsapp_message: WhatsAppMessage,
+    extracted_data: dict,
+    customer_id: Optional[int] = None,
+    whatsapp_group: Optional[WhatsAppGroup] = None,
+    update_customer_count: bool = True
+) -> Optional[dict]:
+    """Process order from extracted message data"""
+    try:
+        # Savepoint so a failed order leaves the message itself intact
+        with db.begin_nested():
+            # Get or create customer, unless the batch already resolved it
+            if customer_id is None:
+                customer_id = _get_or_create_customer_id(
+                    db, 
+                    extracted_data.get("customer_name"),
+                    extracted_data.get("customer_phone"),
+                    whatsapp_message.sender_id
+                )
+            
+            # Get WhatsApp group
+            if whatsapp_group is None:
+                whatsapp_group = db.query(WhatsAppGroup).filter(
+                    WhatsAppGroup.group_id == whatsapp_message.group_id
+                ).first()
+            
+            if not whatsapp_group:
+                # Create group if not exists
+                whatsapp_group = WhatsAppGroup(
+                    group_id=whatsapp_message.group_id,
+                    group_name=f"Group {whatsapp_message.group_id}",
+                    is_active=True
+                )
+                db.add(whatsapp_group)
+                db.flush()
+
+            # Create order, reading the new id back via RETURNING
+            order_id = db.execute(
+                insert(Order).values(
+                    customer_id=customer_id,
+                    group_id=whatsapp_group.id,
+                    message_id=whatsapp_message.message_id,
+                    order_date=whatsapp_message.timestamp.date(),
+                    order_time=whatsapp_message.timestamp.strftime("%I:%M %p"),
+                    status="pending",
+                    notes=extracted_data.get("notes"),
+                    raw_message=whatsapp_message.message_content,
+                    is_processed=True
+                ).returning(Order.id)
+            ).scalar_one()
+
+            # Create order items in a single executemany
+            items = extracted_data.get("items", [])
+            if items:
+                db.execute(insert(OrderItem), [
+                    {
+                        "order_id": order_id,
+                        "product_name": item_data.get("name"),
+                        "quantity": item_data.get("quantity", 1),
+                        "unit_price": parse_price(item_data.get("price")),
+                        "notes": item_data.get("notes")
+                    }
+                    for item_data in items
+                ])
+
+            # Update customer order count
+            if update_customer_count:
+                db.execute(
+                    update(Customer)
+                    .where(Customer.id == customer_id)
+                    .values(total_orders=Customer.total_orders + 1)
+                )
+
         return {
-            "order_id": order.id,
-            "customer_id": customer.id,
+            "order_id": order_id,
+            "customer_id": customer_id,
             "items_count": len(items)
         }
 
     except Exception as e:
         logger.error(f"Error creating order: {str(e)}")
-        db.rollback()
         return None
 
 
-def _get_or_create_customer(db, name: str, phone: str, whatsapp_id: str) -> Customer:
-    """Get existing customer or create new one"""
+def _get_or_create_customer_id(db, name: str, phone: str, whatsapp_id: str) -> int:
+    """Get existing customer id or create a new customer"""
+    # Chatty senders hit the per-worker cache instead of the database
+    if whatsapp_id:
+        cached_id = _customer_id_cache.get(whatsapp_id)
+        if cached_id is not None:
+            return cached_id
+
     # Try to find by WhatsApp ID first
     customer = None
     if whatsapp_id:
@@ -216,10 +465,12 @@ def _get_or_create_customer(db, name: str, phone: str, whatsapp_id: str) -> Cust
             total_orders=0
         )
         db.add(customer)
-        db.commit()
-        db.refresh(customer)
+        db.flush()
+        # Not cached yet: the order savepoint may still roll the insert back
+    elif customer.whatsapp_id == whatsapp_id:
+        _customer_id_cache[whatsapp_id] = customer.id
     
-    return customer
+    return customer.id
 
 
 @celery_app.task(
@@ -228,38 +479,64 @@ def _get_or_create_customer(db, name: str, phone: str, whatsapp_id: str) -> Cust
 )
 def bulk_process_messages(self, messages_data: List[dict]):
     """Process multiple WhatsApp messages in bulk"""
-    results = []
     total_messages = len(messages_data)
-    
-    for i, message_data in enumerate(messages_data):
-        try:
-            current_task.update_state(
-                state='PROCESSING',
-                meta={
-                    'step': f'Processing message {i+1} of {total_messages}',
-                    'progress': ((i+1) / total_messages) * 100
+
+    # Drop already-stored messages with one IN query before dispatching
+    db = get_db_session()
+    try:
+        existing_ids = _existing_message_ids(db, [m.get("message_id") for m in messages_data])
+    finally:
+        db.close()
+
+    skipped = [
+        {
+            "message_id": message_data.get("message_id"),
+            "status": "skipped",
+            "reason": "already_processed"
+        }
+        for message_data in messages_data
+        if message_data.get("message_id") in existing_ids
+    ]
+    messages_data = [m for m in messages_data if m.get("message_id") not in existing_ids]
+
+    # Publish the whole batch as one group instead of one apply_async per message;
+    # process_message_batch then writes them in transactions of up to
+    # MESSAGE_BATCH_SIZE and stores each message's result itself
+    try:
+        group_result = group(
+            process_message_batch.s(message_data)
+            for message_data in messages_data
+        ).apply_async()
+    except Exception as e:
+        logger.error(f"Error queuing message processing: {str(e)}")
+        return {
+            "total_messages": total_messages,
+            "queued_successfully": 0,
+            "results": skipped + [
+                {
+                    "message_id": message_data.get("message_id"),
+                    "status": "error",
+                    "error": str(e)
                 }
-            )
-            
-            result = process_whatsapp_message.apply_async(args=[message_data])
-            results.append({
-                "message_id": message_data.get("message_id"),
-                "task_id": result.id,
-                "status": "queued"
-            })
-            
-        except Exception as e:
-            logger.error(f"Error queuing message processing: {str(e)}")
-            results.append({
-                "message_id": message_data.get("message_id"),
-                "status": "error",
-                "error": str(e)
-            })
-    
+                for message_data in messages_data
+            ]
+        }
+
+    results = [
+        {
+            "message_id": message_data.get("message_id"),
+            "task_id": result.id,
+            "status": "queued"
+        }
+        for message_data, result in zip(messages_data, group_result.results)
+    ]
+
     return {
         "total_messages": total_messages,
-        "queued_successfully": len([r for r in results if r["status"] == "queued"]),
-        "results": results
+        "queued_successfully": len(results),
+        "skipped": len(skipped),
+        "group_id": group_result.id,
+        "results": skipped + results
     }
 
 
@@ -298,7 +575,10 @@ def reprocess_failed_messages(self):
                     "timestamp": message.timestamp.isoformat()
                 }
                 
-                result = process_whatsapp_message.apply_async(args=[message_data])
+                result = process_whatsapp_message.apply_async(
+                    args=[message_data],
+                    ignore_result=True
+                )
                 results.append({
                     "message_id": message.message_id,
                     "task_id": result.id,
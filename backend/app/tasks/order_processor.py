@@ -5,18 +5,22 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from celery import current_task
+from sqlalchemy import String, bindparam, delete, event, func, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import selectinload
 
 from app.celery_config import celery_app
-from app.database import SessionLocal
+from app.database import TaskSession
 from app.models import Order, Customer, OrderItem, WhatsAppGroup, Product
-from app.services.ai_service import enhance_order_data
+from app.pricing import parse_price
+from app.services.ai_service import enhance_order_data_batch
 
 logger = logging.getLogger(__name__)
 
 
 def get_db_session():
     """Get database session for Celery tasks"""
-    return SessionLocal()
+    return TaskSession()
 
 
 @celery_app.task(
@@ -63,6 +67,49 @@ def process_order_confirmation(self, order_id: int, confirmation_data: dict):
         db.close()
 
 
+def _match_product(db, product_name: str) -> Optional[Product]:
+    """Find the catalogue product that best matches an item name"""
+    if db.bind.dialect.name == "postgresql":
+        # Trigram similarity, served by the ix_products_name_trgm GIN index
+        return db.query(Product).filter(
+            Product.name.op("%")(product_name)
+        ).order_by(func.similarity(Product.name, product_name).desc()).first()
+
+    return db.query(Product).filter(
+        Product.name.ilike(f"%{product_name}%")
+    ).first()
+
+
+def _match_products(db, product_names: set) -> Dict[str, Product]:
+    """Map each item name to its best-matching catalogue product"""
+    if not product_names:
+        return {}
+
+    if db.bind.dialect.name != "postgresql":
+        matches = {name: _match_product(db, name) for name in product_names}
+        return {name: product for name, product in matches.items() if product}
+
+    # Best trigram match per name via LATERAL, then load those products
+    rows = db.execute(
+        text(
+            "SELECT q.name, p.id FROM unnest(:names) AS q(name) "
+            "CROSS JOIN LATERAL ("
+            "  SELECT id FROM products WHERE name % q.name "
+            "  ORDER BY similarity(name, q.name) DESC LIMIT 1"
+            ") p"
+        ).bindparams(bindparam("names", type_=ARRAY(String))),
+        {"names": list(product_names)}
+    ).all()
+    if not rows:
+        return {}
+
+    by_id = {
+        product.id: product
+        for product in db.query(Product).filter(Product.id.in_({pid for _, pid in rows}))
+    }
+    return {name: by_id[pid] for name, pid in rows}
+
+
 @celery_app.task(
     bind=True,
     name="app.tasks.order_processor.enhance_order_items"
@@ -76,38 +123,39 @@ def enhance_order_items(self, order_id: int):
             meta={'step': 'Loading order'}
         )
 
-        order = db.query(Order).filter(Order.id == order_id).first()
+        order = db.query(Order).options(
+            selectinload(Order.order_items)
+        ).filter(Order.id == order_id).first()
         if not order:
             raise ValueError(f"Order {order_id} not found")
 
-        enhanced_items = []
-        for item in order.order_items:
-            current_task.update_state(
-                state='PROCESSING',
-                meta={'step': f'Enhancing item: {item.product_name}'}
-            )
-
-            # Try to match with existing products
-            product = db.query(Product).filter(
-                Product.name.ilike(f"%{item.product_name}%")
-            ).first()
+        items = order.order_items
 
+        # Match every item against the catalogue in one round trip
+        products = _match_products(db, {item.product_name for item in items})
+        for item in items:
+            product = products.get(item.product_name)
             if product:
                 item.product_id = product.id
                 if not item.unit_price and product.price:
-                    item.unit_price = product.price
+                    item.unit_price = parse_price(product.price)
 
-            # Use AI to enhance item data
-            enhancement = enhance_order_data({
+        # Use AI to enhance item data, one call for the whole order
+        enhancements = enhance_order_data_batch([
+            {
                 "product_name": item.product_name,
                 "quantity": item.quantity,
                 "current_price": item.unit_price,
                 "notes": item.notes
-            })
+            }
+            for item in items
+        ])
 
+        enhanced_items = []
+        for item, enhancement in zip(items, enhancements):
             if enhancement:
                 if enhancement.get("suggested_price") and not item.unit_price:
-                    item.unit_price = enhancement["suggested_price"]
+                    item.unit_price = parse_price(enhancement["suggested_price"])
                 if enhancement.get("category"):
                     item.category = enhancement["category"]
 
@@ -148,20 +196,12 @@ def calculate_order_totals(self, order_id: int):
         if not order:
             raise ValueError(f"Order {order_id} not found")
 
-        total_items = 0
-        total_amount = 0.0
-        
-        for item in order.order_items:
-            total_items += item.quantity
-            
-            if item.unit_price:
-                try:
-                    # Clean price string and convert to float
-                    price_str = item.unit_price.replace('₹', '').replace('$', '').replace(',', '').strip()
-                    price = float(price_str)
-                    total_amount += price * item.quantity
-                except (ValueError, AttributeError):
-                    logger.warning(f"Could not parse price for item {item.id}: {item.unit_price}")
+        # Sum quantities and quantity * price in the database
+        total_items, total_amount = db.query(
+            func.coalesce(func.sum(OrderItem.quantity), 0),
+            func.coalesce(func.sum(OrderItem.unit_price * OrderItem.quantity), 0)
+        ).filter(OrderItem.order_id == order_id).one()
+        total_amount = float(total_amount)
 
         # Update order with calculated totals
         order.total_items = total_items
@@ -194,19 +234,20 @@ def auto_complete_pending_orders(self):
         # Find orders pending for more than 24 hours
         cutoff_time = datetime.utcnow() - timedelta(hours=24)
         
-        pending_orders = db.query(Order).filter(
-            Order.status == "pending",
-            Order.created_at <= cutoff_time
-        ).all()
-
-        completed_orders = []
-        for order in pending_orders:
-            try:
-                order.status = "auto_confirmed"
-                order.notes = f"{order.notes or ''}\n[AUTO] Confirmed after 24h timeout".strip()
-                completed_orders.append(order.id)
-            except Exception as e:
-                logger.error(f"Error auto-completing order {order.id}: {str(e)}")
+        # Confirm them all in one UPDATE ... RETURNING instead of loading each order
+        completed_orders = db.execute(
+            update(Order)
+            .where(Order.status == "pending", Order.created_at <= cutoff_time)
+            .values(
+                status="auto_confirmed",
+                notes=func.ltrim(
+                    func.coalesce(Order.notes, "") + "\n[AUTO] Confirmed after 24h timeout",
+                    "\n"
+                )
+            )
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
 
         db.commit()
 
@@ -253,35 +294,53 @@ def merge_duplicate_orders(self, customer_id: int, time_window_minutes: int = 5)
         primary_order = recent_orders[0]
         duplicate_orders = recent_orders[1:]
 
-        merged_items = []
+        primary_id = primary_order.id
+        dupe_ids = [d.id for d in duplicate_orders]
+
+        merged_items = [
+            {
+                "product_name": product_name,
+                "quantity": quantity,
+                "from_order": from_order
+            }
+            for product_name, quantity, from_order in db.query(
+                OrderItem.product_name, OrderItem.quantity, OrderItem.order_id
+            ).filter(OrderItem.order_id.in_(dupe_ids)).order_by(OrderItem.order_id, OrderItem.id)
+        ]
+
+        # Update primary order notes
         for duplicate_order in duplicate_orders:
-            # Move items to primary order
-            for item in duplicate_order.order_items:
-                item.order_id = primary_order.id
-                merged_items.append({
-                    "product_name": item.product_name,
-                    "quantity": item.quantity,
-                    "from_order": duplicate_order.id
-                })
-
-            # Update primary order notes
             if duplicate_order.notes:
                 primary_order.notes = f"{primary_order.notes or ''}\nMerged: {duplicate_order.notes}".strip()
 
-            # Delete duplicate order
-            db.delete(duplicate_order)
+        # Move items to primary order and delete the duplicates, one statement each
+        db.execute(
+            update(OrderItem)
+            .where(OrderItem.order_id.in_(dupe_ids))
+            .values(order_id=primary_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            delete(Order)
+            .where(Order.id.in_(dupe_ids))
+            .execution_options(synchronize_session=False)
+        )
+
+        # Recalculate totals for primary order, enqueued only if the merge commits
+        event.listen(
+            db, "after_commit",
+            lambda session: calculate_order_totals.delay(primary_id),
+            once=True
+        )
 
         db.commit()
 
-        # Recalculate totals for primary order
-        calculate_order_totals.delay(primary_order.id)
-
-        logger.info(f"Merged {len(duplicate_orders)} duplicate orders into order {primary_order.id}")
+        logger.info(f"Merged {len(dupe_ids)} duplicate orders into order {primary_id}")
         return {
-            "primary_order_id": primary_order.id,
-            "merged_orders": [o.id for o in duplicate_orders],
+            "primary_order_id": primary_id,
+            "merged_orders": dupe_ids,
             "merged_items": merged_items,
-            "merged_count": len(duplicate_orders)
+            "merged_count": len(dupe_ids)
         }
 
     except Exception as e:
@@ -300,7 +359,11 @@ def validate_order_data(self, order_id: int):
     """Validate and clean order data"""
     db = get_db_session()
     try:
-        order = db.query(Order).filter(Order.id == order_id).first()
+        order = db.query(Order).options(
+            selectinload(Order.order_items),
+            selectinload(Order.customer),
+            selectinload(Order.group)
+        ).filter(Order.id == order_id).first()
         if not order:
             raise ValueError(f"Order {order_id} not found")
 
@@ -1,23 +1,234 @@
 """
 Summary generation tasks for Celery
 """
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from celery import current_task
-
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from celery import chain, current_task, group
+from sqlalchemy import event, extract, func, insert, literal
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+from app.cache import cache_get, cache_set
 from app.celery_config import celery_app
-from app.database import SessionLocal
+from app.database import TaskSession
 from app.models import (
     Order, Customer, OrderItem, WhatsAppGroup, OrderSummary
 )
 
 logger = logging.getLogger(__name__)
 
+# Daily summaries are keyed on the day's order and item counts and latest
+# updates, so re-running an unchanged day returns the saved summary for a day
+DAILY_SUMMARY_CACHE_TTL = 24 * 60 * 60
+
+# customer id -> (name, phone_number) for customers summarised recently by
+# this worker. ORM updates in this process evict an entry straight away;
+# the TTL bounds staleness from updates made elsewhere.
+_customer_meta_cache = TTLCache(maxsize=10000, ttl=300)
+
+# Orders fetched per round trip while building a daily summary
+DAILY_SUMMARY_BATCH_SIZE = 500
+
+# Day names indexed by extract('dow'), which counts from Sunday = 0
+DAY_NAMES = (
+    'Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'
+)
+
+# Products listed in a weekly summary's top_products
+TOP_PRODUCTS_LIMIT = 50
+
+# Rows handed to bulk_save_objects per call when saving many summaries
+SUMMARY_BULK_CHUNK_SIZE = 500
+
+# Groups summarised per subtask when fanning out over every group
+SUMMARY_GROUP_CHUNK_SIZE = 10
+
 
 def get_db_session():
     """Get database session for Celery tasks"""
-    return SessionLocal()
+    return TaskSession()
+
+
+def _customer_meta(db, customer_id: int) -> Optional[Tuple[str, str]]:
+    """Get a customer's (name, phone_number), cached per worker"""
+    meta = _customer_meta_cache.get(customer_id)
+    if meta is None:
+        row = db.query(Customer.name, Customer.phone_number).filter(
+            Customer.id == customer_id
+        ).first()
+        if row is None:
+            return None
+        meta = _customer_meta_cache[customer_id] = tuple(row)
+    return meta
+
+
+@event.listens_for(Customer, "after_update")
+def _invalidate_customer_meta(mapper, connection, target):
+    """Drop a customer's cached name and phone when this process updates it"""
+    _customer_meta_cache.pop(target.id, None)
+
+
+def _build_daily_summary(
+    db, target_date, group_id: Optional[int] = None, generated_at: Optional[str] = None,
+    signature: Optional[str] = None
+) -> Optional[Dict]:
+    """Build the summary data for one day, or None if it has no orders; the
+    day's signature is recorded so saved copies can be checked for staleness"""
+    day_filters = [Order.order_date == target_date]
+    if group_id:
+        day_filters.append(Order.group_id == group_id)
+
+    # Most (date, group) pairs in a fanout are empty; settle those with a
+    # single EXISTS before loading any orders
+    if not db.query(literal(True)).filter(
+        db.query(Order).filter(*day_filters).exists()
+    ).scalar():
+        return None
+
+    # Taken before reading, so a change made while building leaves it stale
+    if signature is None:
+        signature = _daily_summary_signature(db, target_date, group_id)
+
+    # Query orders for the target date with items loaded up front; customer
+    # details come from _customer_meta and raiseload flags any relationship access
+    query = db.query(Order).options(
+        load_only(Order.id, Order.customer_id, Order.order_time, Order.status),
+        selectinload(Order.order_items).load_only(
+            OrderItem.order_id,
+            OrderItem.product_name,
+            OrderItem.quantity,
+            OrderItem.unit_price,
+            OrderItem.notes
+        ),
+        raiseload('*')
+    ).filter(*day_filters)
+
+    # Generate summary data, aggregating orders as they stream in batches
+    customer_summaries = {}
+    total_orders = 0
+    total_items = 0
+
+    for order in query.execution_options(stream_results=True).yield_per(DAILY_SUMMARY_BATCH_SIZE):
+        total_orders += 1
+        customer_summary = customer_summaries.get(order.customer_id)
+        if customer_summary is None:
+            customer_name, customer_phone = _customer_meta(db, order.customer_id)
+            customer_summary = customer_summaries[order.customer_id] = {
+                "customer_name": customer_name,
+                "customer_phone": customer_phone,
+                "orders": [],
+                "total_quantity": 0,
+                "items": Counter()
+            }
+
+        order_items = [
+            {
+                "product_name": item.product_name,
+                "quantity": item.quantity,
+                "unit_price": float(item.unit_price) if item.unit_price is not None else None,
+                "notes": item.notes
+            }
+            for item in order.order_items
+        ]
+
+        # Aggregate by product; an order can list the same product twice
+        product_totals = customer_summary["items"]
+        for item in order.order_items:
+            product_totals[item.product_name] += item.quantity
+
+        order_quantity = sum(item.quantity for item in order.order_items)
+        customer_summary["total_quantity"] += order_quantity
+        total_items += order_quantity
+
+        customer_summary["orders"].append({
+            "order_id": order.id,
+            "order_time": order.order_time,
+            "status": order.status,
+            "items": order_items
+        })
+
+    if not total_orders:
+        return None
+
+    # Convert to list format
+    customers_list = []
+    for customer_data in customer_summaries.values():
+        items_list = [
+            {"name": name, "quantity": qty} 
+            for name, qty in customer_data["items"].items()
+        ]
+        
+        customers_list.append({
+            "customer_name": customer_data["customer_name"],
+            "customer_phone": customer_data["customer_phone"],
+            "items": items_list,
+            "total_quantity": customer_data["total_quantity"],
+            "total_orders": len(customer_data["orders"]),
+            "orders": customer_data["orders"]
+        })
+
+    summary_data = {
+        "date": target_date.isoformat(),
+        "total_orders": total_orders,
+        "total_customers": len(customer_summaries),
+        "total_items": total_items,
+        "customers": customers_list,
+        "generated_at": generated_at or datetime.utcnow().isoformat(),
+        "source_signature": signature
+    }
+
+    return summary_data
+
+
+def _daily_summary_signature(db, target_date, group_id: Optional[int] = None) -> str:
+    """Signature of a day's orders that changes whenever an order for the day,
+    or one of its items, is added, removed or updated"""
+    query = db.query(
+        func.count(func.distinct(Order.id)),
+        func.max(Order.updated_at),
+        func.count(OrderItem.id),
+        func.max(OrderItem.updated_at)
+    ).select_from(Order).outerjoin(
+        OrderItem, OrderItem.order_id == Order.id
+    ).filter(Order.order_date == target_date)
+    if group_id:
+        query = query.filter(Order.group_id == group_id)
+    order_count, orders_updated, item_count, items_updated = query.one()
+    return f"{order_count}:{orders_updated}:{item_count}:{items_updated}"
+
+
+def _daily_summary_cache_key(target_date, group_id: Optional[int], signature: str) -> str:
+    """Cache key of a day's summary at a given signature"""
+    return f"summary:daily:{target_date.isoformat()}:{group_id}:{signature}"
+
+
+def _order_summary_values(target_date, group_id: Optional[int], summary_data: Dict) -> Dict:
+    """Column values of the OrderSummary row for built summary data"""
+    return {
+        "summary_date": target_date,
+        "group_id": group_id,
+        "total_orders": summary_data["total_orders"],
+        "total_customers": summary_data["total_customers"],
+        "total_items": summary_data["total_items"],
+        "summary_data": summary_data
+    }
+
+
+def _order_summary(target_date, group_id: Optional[int], summary_data: Dict) -> OrderSummary:
+    """Wrap built summary data in an OrderSummary row"""
+    return OrderSummary(**_order_summary_values(target_date, group_id, summary_data))
+
+
+def _insert_order_summary(db, target_date, group_id: Optional[int], summary_data: Dict) -> int:
+    """Insert an OrderSummary row in one INSERT ... RETURNING round trip"""
+    return db.execute(
+        insert(OrderSummary).values(
+            **_order_summary_values(target_date, group_id, summary_data)
+        ).returning(OrderSummary.id)
+    ).scalar_one()
 
 
 @celery_app.task(
@@ -28,132 +239,257 @@ def generate_daily_summary(self, date_str: str = None, group_id: int = None):
     """Generate daily order summary"""
     db = get_db_session()
     try:
+        now = datetime.utcnow()
+
         # Parse date or use today
         if date_str:
-            target_date = datetime.fromisoformat(date_str).date()
+            target_date = date.fromisoformat(date_str)
         else:
-            target_date = datetime.utcnow().date()
+            target_date = now.date()
 
         current_task.update_state(
             state='PROCESSING',
             meta={'step': f'Generating summary for {target_date}'}
         )
 
-        # Query orders for the target date
-        query = db.query(Order).filter(
-            Order.order_date == target_date
-        )
-        
-        if group_id:
-            query = query.filter(Order.group_id == group_id)
-        
-        orders = query.all()
+        signature = _daily_summary_signature(db, target_date, group_id)
+        cache_key = _daily_summary_cache_key(target_date, group_id, signature)
+        cached = cache_get(cache_key)
+        if cached:
+            return json.loads(cached)
 
-        if not orders:
+        summary_data = _build_daily_summary(db, target_date, group_id, now.isoformat(), signature)
+        if summary_data is None:
             return {
                 "date": target_date.isoformat(),
                 "message": "No orders found for this date",
                 "summary": None
             }
 
-        # Generate summary data
-        customer_summaries = {}
-        total_items = 0
-        
-        for order in orders:
-            customer_id = order.customer_id
-            if customer_id not in customer_summaries:
-                customer_summaries[customer_id] = {
-                    "customer_name": order.customer.name,
-                    "customer_phone": order.customer.phone_number,
-                    "orders": [],
-                    "total_quantity": 0,
-                    "items": {}
-                }
-            
-            order_items = []
-            for item in order.order_items:
-                product_name = item.product_name
-                quantity = item.quantity
-                
-                # Add to order items
-                order_items.append({
-                    "product_name": product_name,
-                    "quantity": quantity,
-                    "unit_price": item.unit_price,
-                    "notes": item.notes
-                })
-                
-                # Aggregate by product
-                if product_name not in customer_summaries[customer_id]["items"]:
-                    customer_summaries[customer_id]["items"][product_name] = 0
-                customer_summaries[customer_id]["items"][product_name] += quantity
-                customer_summaries[customer_id]["total_quantity"] += quantity
-                total_items += quantity
-            
-            customer_summaries[customer_id]["orders"].append({
-                "order_id": order.id,
-                "order_time": order.order_time,
-                "status": order.status,
-                "items": order_items
-            })
-
-        # Convert to list format
-        customers_list = []
-        for customer_data in customer_summaries.values():
-            items_list = [
-                {"name": name, "quantity": qty} 
-                for name, qty in customer_data["items"].items()
-            ]
-            
-            customers_list.append({
-                "customer_name": customer_data["customer_name"],
-                "customer_phone": customer_data["customer_phone"],
-                "items": items_list,
-                "total_quantity": customer_data["total_quantity"],
-                "total_orders": len(customer_data["orders"]),
-                "orders": customer_data["orders"]
-            })
+        # Save summary to database
+        summary_id = _insert_order_summary(db, target_date, group_id, summary_data)
+        db.commit()
 
-        summary_data = {
+        logger.info(f"Generated summary for {target_date}: {summary_data['total_orders']} orders, {summary_data['total_customers']} customers")
+        
+        result = {
+            "summary_id": summary_id,
             "date": target_date.isoformat(),
-            "total_orders": len(orders),
-            "total_customers": len(customer_summaries),
-            "total_items": total_items,
-            "customers": customers_list,
-            "generated_at": datetime.utcnow().isoformat()
+            "summary": summary_data
         }
+        cache_set(cache_key, json.dumps(result), DAILY_SUMMARY_CACHE_TTL)
+        return result
 
-        # Save summary to database
-        order_summary = OrderSummary(
-            summary_date=target_date,
-            group_id=group_id,
-            total_orders=len(orders),
-            total_customers=len(customer_summaries),
-            total_items=total_items,
-            summary_data=summary_data
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error generating daily summary: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.summary_generator.generate_daily_summaries_bulk"
+)
+def generate_daily_summaries_bulk(self, date_strs: List[str], group_id: int = None):
+    """Generate daily summaries for many dates and save them in one transaction"""
+    db = get_db_session()
+    try:
+        current_task.update_state(
+            state='PROCESSING',
+            meta={'step': f'Generating summaries for {len(date_strs)} dates'}
         )
-        
-        db.add(order_summary)
+
+        # Every summary in the call shares one generation timestamp
+        generated_at = datetime.utcnow().isoformat()
+        summaries = []
+        skipped = []
+        for date_str in date_strs:
+            target_date = date.fromisoformat(date_str)
+            summary_data = _build_daily_summary(db, target_date, group_id, generated_at)
+            # Loaded orders are not needed once the day is summarised
+            db.expunge_all()
+            if summary_data is None:
+                skipped.append(target_date.isoformat())
+                continue
+            summaries.append(_order_summary(target_date, group_id, summary_data))
+
+        # One commit for every row instead of one round trip per summary
+        for chunk_start in range(0, len(summaries), SUMMARY_BULK_CHUNK_SIZE):
+            db.bulk_save_objects(
+                summaries[chunk_start:chunk_start + SUMMARY_BULK_CHUNK_SIZE]
+            )
         db.commit()
-        db.refresh(order_summary)
 
-        logger.info(f"Generated summary for {target_date}: {len(orders)} orders, {len(customer_summaries)} customers")
-        
+        logger.info(f"Generated {len(summaries)} daily summaries, {len(skipped)} dates had no orders")
+
+        return {
+            "generated": len(summaries),
+            "dates": [summary.summary_date.isoformat() for summary in summaries],
+            "skipped_dates": skipped
+        }
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error generating daily summaries: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.summary_generator.generate_daily_summary_batch"
+)
+def generate_daily_summary_batch(self, date_str: str, group_ids: List[int]):
+    """Generate one day's summaries for a batch of groups"""
+    db = get_db_session()
+    try:
+        target_date = date.fromisoformat(date_str)
+        generated_at = datetime.utcnow().isoformat()
+
+        summaries = []
+        for group_id in group_ids:
+            summary_data = _build_daily_summary(db, target_date, group_id, generated_at)
+            db.expunge_all()
+            if summary_data is not None:
+                summaries.append(_order_summary(target_date, group_id, summary_data))
+
+        db.bulk_save_objects(summaries)
+        db.commit()
+
+        logger.info(f"Generated {len(summaries)} group summaries for {target_date}")
+
         return {
-            "summary_id": order_summary.id,
             "date": target_date.isoformat(),
-            "summary": summary_data
+            "groups": len(group_ids),
+            "generated": len(summaries)
         }
 
     except Exception as e:
         db.rollback()
-        logger.error(f"Error generating daily summary: {str(e)}")
+        logger.error(f"Error generating group summaries: {str(e)}")
         raise
     finally:
         db.close()
 
 
+@celery_app.task(
+    bind=True,
+    name="app.tasks.summary_generator.generate_all_daily_summaries"
+)
+def generate_all_daily_summaries(self, date_str: str = None):
+    """Fan one day's summaries out across workers, one subtask per batch of groups"""
+    db = get_db_session()
+    try:
+        # Resolve the date once so every subtask summarises the same day
+        if date_str:
+            target_date = date.fromisoformat(date_str)
+        else:
+            target_date = datetime.utcnow().date()
+
+        group_ids = [group_id for group_id, in db.query(WhatsAppGroup.id).all()]
+        chunks = [
+            group_ids[i:i + SUMMARY_GROUP_CHUNK_SIZE]
+            for i in range(0, len(group_ids), SUMMARY_GROUP_CHUNK_SIZE)
+        ]
+
+        group_result = group(
+            generate_daily_summary_batch.s(target_date.isoformat(), chunk)
+            for chunk in chunks
+        ).apply_async()
+
+        logger.info(f"Queued {len(chunks)} summary batches for {len(group_ids)} groups on {target_date}")
+
+        return {
+            "date": target_date.isoformat(),
+            "groups": len(group_ids),
+            "batches": len(chunks),
+            "group_id": group_result.id
+        }
+
+    except Exception as e:
+        logger.error(f"Error queuing group summaries: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.summary_generator.aggregate_daily_summary"
+)
+def aggregate_daily_summary(self, date_str: str, group_id: int = None):
+    """Read and aggregate one day's orders; first stage of regenerate_daily_summaries"""
+    db = get_db_session()
+    try:
+        return _build_daily_summary(db, date.fromisoformat(date_str), group_id)
+
+    except Exception as e:
+        logger.error(f"Error aggregating daily summary: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.summary_generator.persist_daily_summary"
+)
+def persist_daily_summary(self, summary_data: Optional[Dict], group_id: int = None):
+    """Save the output of aggregate_daily_summary; second stage of regenerate_daily_summaries"""
+    if summary_data is None:
+        return {"summary_id": None, "message": "No orders found for this date"}
+
+    db = get_db_session()
+    try:
+        target_date = date.fromisoformat(summary_data["date"])
+        summary_id = _insert_order_summary(db, target_date, group_id, summary_data)
+        db.commit()
+
+        return {
+            "summary_id": summary_id,
+            "date": target_date.isoformat()
+        }
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error saving daily summary: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.summary_generator.regenerate_daily_summaries"
+)
+def regenerate_daily_summaries(self, date_strs: List[str], group_ids: List[int] = None):
+    """Regenerate summaries for every (date, group) pair as aggregate -> persist chains"""
+    # Splitting read and write into chained tasks lets one pair's commit run
+    # on one worker while another worker is still aggregating the next pair
+    pairs = [
+        (date_str, group_id)
+        for date_str in date_strs
+        for group_id in (group_ids or [None])
+    ]
+    group_result = group(
+        chain(
+            aggregate_daily_summary.s(date_str, group_id),
+            persist_daily_summary.s(group_id=group_id)
+        )
+        for date_str, group_id in pairs
+    ).apply_async()
+
+    logger.info(f"Queued {len(pairs)} daily summary regenerations")
+
+    return {
+        "queued": len(pairs),
+        "group_id": group_result.id
+    }
+
+
 @celery_app.task(
     bind=True,
     name="app.tasks.summary_generator.generate_weekly_summary"
@@ -162,11 +498,13 @@ def generate_weekly_summary(self, week_start_date: str = None, group_id: int = N
     """Generate weekly order summary"""
     db = get_db_session()
     try:
+        now = datetime.utcnow()
+
         # Parse week start date or use current week
         if week_start_date:
-            start_date = datetime.fromisoformat(week_start_date).date()
+            start_date = date.fromisoformat(week_start_date)
         else:
-            today = datetime.utcnow().date()
+            today = now.date()
             start_date = today - timedelta(days=today.weekday())
 
         end_date = start_date + timedelta(days=6)
@@ -176,84 +514,89 @@ def generate_weekly_summary(self, week_start_date: str = None, group_id: int = N
             meta={'step': f'Generating weekly summary from {start_date} to {end_date}'}
         )
 
-        # Query orders for the week
-        query = db.query(Order).filter(
-            Order.order_date >= start_date,
-            Order.order_date <= end_date
+        # Roll the week up from the saved daily summaries (latest row per day)
+        group_filter = (
+            OrderSummary.group_id == group_id if group_id
+            else OrderSummary.group_id.is_(None)
         )
-        
-        if group_id:
-            query = query.filter(Order.group_id == group_id)
-        
-        orders = query.all()
-
-        # Group orders by date
         daily_summaries = {}
-        week_totals = {
-            "total_orders": 0,
-            "total_customers": set(),
-            "total_items": 0,
-            "product_totals": {}
-        }
-
-        for order in orders:
-            order_date = order.order_date.isoformat()
-            if order_date not in daily_summaries:
-                daily_summaries[order_date] = {
-                    "date": order_date,
-                    "orders": 0,
-                    "customers": set(),
-                    "items": 0
-                }
-
-            daily_summaries[order_date]["orders"] += 1
-            daily_summaries[order_date]["customers"].add(order.customer_id)
-            
-            week_totals["total_orders"] += 1
-            week_totals["total_customers"].add(order.customer_id)
-
-            for item in order.order_items:
-                quantity = item.quantity
-                daily_summaries[order_date]["items"] += quantity
-                week_totals["total_items"] += quantity
-                
-                product_name = item.product_name
-                if product_name not in week_totals["product_totals"]:
-                    week_totals["product_totals"][product_name] = 0
-                week_totals["product_totals"][product_name] += quantity
-
-        # Convert daily summaries
+        for summary_date, summary_data in db.query(
+            OrderSummary.summary_date, OrderSummary.summary_data
+        ).filter(
+            OrderSummary.summary_date >= start_date,
+            OrderSummary.summary_date <= end_date,
+            group_filter
+        ).order_by(OrderSummary.id):
+            daily_summaries[summary_date.date()] = summary_data
+
+        # Past days reuse their saved summary only while its signature still
+        # matches the day's orders; other days are built now. Rebuilt past
+        # days are saved so the next rollup finds them, today and later may
+        # still change
+        today = now.date()
+        healed = False
+        for offset in range(7):
+            day = start_date + timedelta(days=offset)
+            saved = daily_summaries.get(day)
+            if (
+                day < today and saved is not None
+                and saved.get("source_signature") == _daily_summary_signature(db, day, group_id)
+            ):
+                continue
+            summary_data = _build_daily_summary(db, day, group_id, now.isoformat())
+            db.expunge_all()
+            if summary_data is None:
+                daily_summaries.pop(day, None)
+                continue
+            daily_summaries[day] = summary_data
+            if day < today:
+                _insert_order_summary(db, day, group_id, summary_data)
+                healed = True
+        if healed:
+            db.commit()
+
+        total_orders = 0
+        total_items = 0
+        week_customers = set()
+        product_totals = Counter()
         daily_list = []
-        for date, data in daily_summaries.items():
+        for day in sorted(daily_summaries):
+            summary_data = daily_summaries[day]
+            total_orders += summary_data["total_orders"]
+            total_items += summary_data["total_items"]
+            for customer in summary_data["customers"]:
+                week_customers.add(customer["customer_phone"])
+                for item in customer["items"]:
+                    product_totals[item["name"]] += item["quantity"]
             daily_list.append({
-                "date": date,
-                "orders": data["orders"],
-                "customers": len(data["customers"]),
-                "items": data["items"]
+                "date": day.isoformat(),
+                "orders": summary_data["total_orders"],
+                "customers": summary_data["total_customers"],
+                "items": summary_data["total_items"]
             })
+        total_customers = len(week_customers)
 
-        # Convert product totals to list
         product_list = [
             {"name": name, "quantity": qty}
-            for name, qty in sorted(week_totals["product_totals"].items(), 
-                                  key=lambda x: x[1], reverse=True)
+            for name, qty in product_totals.most_common(TOP_PRODUCTS_LIMIT)
         ]
 
         summary_data = {
             "week_start": start_date.isoformat(),
             "week_end": end_date.isoformat(),
-            "total_orders": week_totals["total_orders"],
-            "total_customers": len(week_totals["total_customers"]),
-            "total_items": week_totals["total_items"],
-            "daily_breakdown": sorted(daily_list, key=lambda x: x["date"]),
+            "total_orders": total_orders,
+            "total_customers": total_customers,
+            "total_items": total_items,
+            "daily_breakdown": daily_list,
             "top_products": product_list,
-            "generated_at": datetime.utcnow().isoformat()
+            "generated_at": now.isoformat()
         }
 
-        logger.info(f"Generated weekly summary: {week_totals['total_orders']} orders")
+        logger.info(f"Generated weekly summary: {total_orders} orders")
         return summary_data
 
     except Exception as e:
+        db.rollback()
         logger.error(f"Error generating weekly summary: {str(e)}")
         raise
     finally:
@@ -268,88 +611,93 @@ def generate_customer_summary(self, customer_id: int, days_back: int = 30):
     """Generate summary for a specific customer"""
     db = get_db_session()
     try:
+        now = datetime.utcnow()
+
         current_task.update_state(
             state='PROCESSING',
             meta={'step': f'Generating customer summary for customer {customer_id}'}
         )
 
         # Get customer
-        customer = db.query(Customer).filter(Customer.id == customer_id).first()
-        if not customer:
+        customer_meta = _customer_meta(db, customer_id)
+        if not customer_meta:
             raise ValueError(f"Customer {customer_id} not found")
+        customer_name, customer_phone = customer_meta
 
-        # Get recent orders
-        cutoff_date = datetime.utcnow().date() - timedelta(days=days_back)
-        orders = db.query(Order).filter(
+        # Aggregate the customer's recent orders in the database
+        cutoff_date = now.date() - timedelta(days=days_back)
+        order_filters = (
             Order.customer_id == customer_id,
             Order.order_date >= cutoff_date
-        ).order_by(Order.order_date.desc()).all()
-
-        # Analyze order patterns
-        order_patterns = {
-            "total_orders": len(orders),
-            "total_items": 0,
-            "favorite_products": {},
-            "order_frequency": {},
-            "average_order_size": 0,
-            "recent_orders": []
+        )
+
+        total_orders, total_items = db.query(
+            func.count(func.distinct(Order.id)),
+            func.coalesce(func.sum(OrderItem.quantity), 0)
+        ).outerjoin(OrderItem).filter(*order_filters).one()
+
+        product_quantity = func.sum(OrderItem.quantity)
+        favorite_rows = db.query(
+            OrderItem.product_name, product_quantity
+        ).join(Order).filter(*order_filters).group_by(
+            OrderItem.product_name
+        ).order_by(product_quantity.desc()).limit(10).all()
+
+        # extract('dow') is 0 for Sunday on both PostgreSQL and SQLite
+        day_of_week = extract('dow', Order.order_date)
+        frequency_rows = db.query(
+            day_of_week, func.count(Order.id)
+        ).filter(*order_filters).group_by(day_of_week).all()
+
+        recent_orders = db.query(Order).options(
+            load_only(Order.id, Order.order_date, Order.order_time, Order.status),
+            selectinload(Order.order_items).load_only(
+                OrderItem.order_id, OrderItem.quantity
+            )
+        ).filter(*order_filters).order_by(
+            Order.order_date.desc()
+        ).limit(20).all()
+
+        average_order_size = 0
+        if total_orders > 0:
+            average_order_size = round(total_items / total_orders, 2)
+
+        favorite_products_list = [
+            {"name": name, "total_quantity": qty}
+            for name, qty in favorite_rows
+        ]
+
+        order_frequency = {
+            DAY_NAMES[int(dow)]: count
+            for dow, count in frequency_rows
         }
 
-        for order in orders:
-            # Count items
-            order_items_count = sum(item.quantity for item in order.order_items)
-            order_patterns["total_items"] += order_items_count
-
-            # Track favorite products
-            for item in order.order_items:
-                product_name = item.product_name
-                if product_name not in order_patterns["favorite_products"]:
-                    order_patterns["favorite_products"][product_name] = 0
-                order_patterns["favorite_products"][product_name] += item.quantity
-
-            # Track order frequency by day of week
-            day_of_week = order.order_date.strftime("%A")
-            if day_of_week not in order_patterns["order_frequency"]:
-                order_patterns["order_frequency"][day_of_week] = 0
-            order_patterns["order_frequency"][day_of_week] += 1
-
-            # Add to recent orders
-            order_patterns["recent_orders"].append({
+        recent_orders_list = [
+            {
                 "order_id": order.id,
                 "date": order.order_date.isoformat(),
                 "time": order.order_time,
-                "items_count": order_items_count,
+                "items_count": sum(item.quantity for item in order.order_items),
                 "status": order.status
-            })
-
-        # Calculate averages
-        if order_patterns["total_orders"] > 0:
-            order_patterns["average_order_size"] = round(
-                order_patterns["total_items"] / order_patterns["total_orders"], 2
-            )
-
-        # Convert favorite products to sorted list
-        favorite_products_list = [
-            {"name": name, "total_quantity": qty}
-            for name, qty in sorted(order_patterns["favorite_products"].items(),
-                                  key=lambda x: x[1], reverse=True)
+            }
+            for order in recent_orders
         ]
 
         summary_data = {
             "customer_id": customer_id,
-            "customer_name": customer.name,
-            "customer_phone": customer.phone_number,
+            "customer_name": customer_name,
+            "customer_phone": customer_phone,
             "analysis_period_days": days_back,
-            "total_orders": order_patterns["total_orders"],
-            "total_items": order_patterns["total_items"],
-            "average_order_size": order_patterns["average_order_size"],
-            "favorite_products": favorite_products_list[:10],  # Top 10
-            "order_frequency_by_day": order_patterns["order_frequency"],
-            "recent_orders": order_patterns["recent_orders"][:20],  # Last 20
-            "generated_at": datetime.utcnow().isoformat()
+            "total_orders": total_orders,
+            "total_items": total_items,
+            "average_order_size": average_order_size,
+            "favorite_products": favorite_products_list,  # Top 10
+            "order_frequency_by_day": order_frequency,
+            "recent_orders": recent_orders_list,  # Last 20
+            "generated_at": now.isoformat()
         }
 
-        logger.info(f"Generated customer summary for {customer.name}: {order_patterns['total_orders']} orders")
+        logger.info(f"Generated customer summary for {customer_name}: {total_orders} orders")
         return summary_data
 
     except Exception as e:
@@ -367,44 +715,41 @@ def generate_product_summary(self, days_back: int = 30):
     """Generate product popularity summary"""
     db = get_db_session()
     try:
+        now = datetime.utcnow()
+
         current_task.update_state(
             state='PROCESSING',
             meta={'step': 'Analyzing product popularity'}
         )
 
         # Get recent orders
-        cutoff_date = datetime.utcnow().date() - timedelta(days=days_back)
-        order_items = db.query(OrderItem).join(Order).filter(
+        cutoff_date = now.date() - timedelta(days=days_back)
+        # Aggregate per product in the database
+        rows = db.query(
+            OrderItem.product_name,
+            func.sum(OrderItem.quantity),
+            func.count(OrderItem.id),
+            func.count(func.distinct(Order.customer_id))
+        ).join(Order).filter(
             Order.order_date >= cutoff_date
-        ).all()
+        ).group_by(OrderItem.product_name).all()
 
-        product_stats = {}
-        
-        for item in order_items:
-            product_name = item.product_name
-            if product_name not in product_stats:
-                product_stats[product_name] = {
-                    "name": product_name,
-                    "total_quantity": 0,
-                    "total_orders": 0,
-                    "customers": set(),
-                    "average_quantity_per_order": 0
-                }
-
-            product_stats[product_name]["total_quantity"] += item.quantity
-            product_stats[product_name]["total_orders"] += 1
-            product_stats[product_name]["customers"].add(item.order.customer_id)
-
-        # Calculate averages and convert to list
-        products_list = []
-        for stats in product_stats.values():
-            stats["unique_customers"] = len(stats["customers"])
-            stats["average_quantity_per_order"] = round(
-                stats["total_quantity"] / stats["total_orders"], 2
-            )
-            # Remove the set (not JSON serializable)
-            del stats["customers"]
-            products_list.append(stats)
+        total_orders_analyzed = db.query(
+            func.count(func.distinct(Order.id))
+        ).join(OrderItem).filter(
+            Order.order_date >= cutoff_date
+        ).scalar()
+
+        products_list = [
+            {
+                "name": product_name,
+                "total_quantity": total_quantity,
+                "total_orders": total_orders,
+                "average_quantity_per_order": round(total_quantity / total_orders, 2),
+                "unique_customers": unique_customers
+            }
+            for product_name, total_quantity, total_orders, unique_customers in rows
+        ]
 
         # Sort by popularity (total quantity)
         products_list.sort(key=lambda x: x["total_quantity"], reverse=True)
@@ -412,9 +757,9 @@ def generate_product_summary(self, days_back: int = 30):
         summary_data = {
             "analysis_period_days": days_back,
             "total_products": len(products_list),
-            "total_orders_analyzed": len(set(item.order_id for item in order_items)),
+            "total_orders_analyzed": total_orders_analyzed,
             "products": products_list,
-            "generated_at": datetime.utcnow().isoformat()
+            "generated_at": now.isoformat()
         }
 
         logger.info(f"Generated product summary: {len(products_list)} products analyzed")
@@ -0,0 +1,126 @@
+"""
+WhatsApp Web bot tasks for Celery
+
+The bot (one Chrome process and one logged-in WhatsApp Web session) lives in
+a single worker consuming the "whatsapp" queue, started with `-P solo`. API
+processes drive it through these tasks instead of each running its own Chrome.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.celery_config import celery_app
+from app.tasks.message_processor import process_whatsapp_message
+from app.whatsapp.bot import WhatsAppBot
+
+logger = logging.getLogger(__name__)
+
+# Longest a bot task waits for its coroutine; connect() can wait 60s for a QR scan
+BOT_CALL_TIMEOUT = 90
+
+_bot: Optional[WhatsAppBot] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Event loop the bot runs on, kept alive in a background thread so
+    monitoring keeps running between tasks"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="whatsapp-bot-loop", daemon=True).start()
+    return _loop
+
+
+def _get_bot() -> WhatsAppBot:
+    """Get the worker's WhatsApp bot (created on first use)"""
+    global _bot
+    if _bot is None:
+        _bot = WhatsAppBot()
+    return _bot
+
+
+def _run(coro, timeout: float = BOT_CALL_TIMEOUT):
+    """Run a bot coroutine on the bot loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+
+@celery_app.task(name="app.tasks.whatsapp_bot.connect")
+def connect() -> bool:
+    """Connect the bot to WhatsApp Web"""
+    return _run(_get_bot().connect())
+
+
+@celery_app.task(name="app.tasks.whatsapp_bot.get_status")
+def get_status() -> Dict:
+    """Get the bot's connection status"""
+    bot = _get_bot()
+    return {
+        "connected": bot.is_connected,
+        "current_group": bot.current_group
+    }
+
+
+@celery_app.task(name="app.tasks.whatsapp_bot.get_groups")
+def get_groups() -> List[Dict]:
+    """List WhatsApp groups, without their page elements"""
+    groups = _run(_get_bot().get_groups())
+    return [{"name": group["name"], "id": group["id"]} for group in groups]
+
+
+@celery_app.task(name="app.tasks.whatsapp_bot.select_group")
+def select_group(group_name: str) -> bool:
+    """Open a WhatsApp group"""
+    return _run(_get_bot().select_group(group_name))
+
+
+@celery_app.task(name="app.tasks.whatsapp_bot.get_messages")
+def get_messages(group_name: str, limit: int = 50, since_id: Optional[str] = None) -> List[Dict]:
+    """Get recent messages from a group, opening it first if needed; with
+    since_id, only the messages after that one"""
+    bot = _get_bot()
+    if bot.current_group != group_name:
+        _run(bot.select_group(group_name))
+    if since_id:
+        return _run(bot.get_messages_since(since_id, limit=limit))
+    return _run(bot.get_messages(limit=limit))
+
+
+@celery_app.task(name="app.tasks.whatsapp_bot.export_chat")
+def export_chat(group_name: str, days: int = 7) -> Optional[str]:
+    """Export a group's chat to a JSON file on the bot worker"""
+    return _run(_get_bot().export_chat(group_name, days=days))
+
+
+@celery_app.task(name="app.tasks.whatsapp_bot.start_monitoring")
+def start_monitoring(group_name: str, whatsapp_group_id: str) -> bool:
+    """Start monitoring a group; order messages are queued for processing"""
+    bot = _get_bot()
+
+    async def order_callback(message: Dict):
+        process_whatsapp_message.delay({
+            "message_id": message["id"],
+            "group_id": whatsapp_group_id,
+            "sender_id": message["sender"],
+            "sender_name": message["sender"],
+            "message_content": message["content"],
+            "timestamp": datetime.fromtimestamp(message["ts"]).isoformat()
+        })
+
+    # Monitoring runs on the bot loop until disconnect; don't wait for it
+    asyncio.run_coroutine_threadsafe(
+        bot.start_monitoring(group_name, order_callback), _get_loop()
+    )
+    logger.info(f"Monitoring started for group: {group_name}")
+    return True
+
+
+@celery_app.task(name="app.tasks.whatsapp_bot.disconnect")
+def disconnect() -> bool:
+    """Close the bot's browser session"""
+    _run(_get_bot().close())
+    return True
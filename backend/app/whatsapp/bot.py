@@ -1,28 +1,281 @@
 import asyncio
-import json
 import logging
 import os
 import re
+from collections import OrderedDict, deque
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+import orjson
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
 
+# Connections kept open to chromedriver for concurrent WebDriver calls
+WEBDRIVER_POOL_SIZE = 20
+
+# Order detection patterns, compiled once for every polled message
+_ORDER_KEYWORDS = frozenset([
+    "order", "मंगवाना", "चाहिए", "want", "need", "book",
+    "shirt", "jeans", "saree", "kurti", "dress", "पैंट", "शर्ट"
+])
+# All keywords as one alternation, so a message is scanned once rather
+# than once per keyword
+_ORDER_KEYWORDS_RE = re.compile("|".join(re.escape(keyword) for keyword in sorted(_ORDER_KEYWORDS)))
+_DIGIT_RE = re.compile(r'\d')
+# "5 pieces" or "<word> 5", in one pass. The word must be letters and the
+# number at most 4 digits, so phone numbers and ids don't count.
+_QUANTITY_RE = re.compile(r'\b\d+\s*(?:piece|pc|pcs|पीस|pieces?)\b|\b[^\W\d_]+\s+\d{1,4}\b')
+# Product patterns as one alternation, so a message is scanned once; named
+# groups tell which form matched. Matched against the lowered text.
+_PRODUCT_RE = re.compile("|".join([
+    # Pattern: "cotton shirt 5 pieces"
+    r'(?P<a_item>\w+\s+\w+)\s+(?P<a_qty>\d+)\s*(?:piece|pc|pcs|पीस|pieces?)',
+    # Pattern: "5 cotton shirts"
+    r'(?P<b_qty>\d+)\s+(?P<b_item>\w+\s+\w+)',
+    # Pattern: "shirt - 5"
+    r'(?P<c_item>\w+)\s*[-:]\s*(?P<c_qty>\d+)',
+    # Pattern: "5x shirts"
+    r'(?P<d_qty>\d+)x?\s*(?P<d_item>\w+)',
+]))
+
+# Lists group chats (name plus chat element) in one round trip
+_LIST_GROUPS_JS = """
+const out = [];
+for (const chat of document.querySelectorAll("div[data-testid='chat-list'] > div")) {
+    const name = chat.querySelector("span[title]");
+    if (!name || !chat.querySelector("span[data-testid='default-group']")) continue;
+    out.push({name: name.getAttribute("title"), element: chat});
+}
+return out;
+"""
+
+# Clicks the chat titled arguments[0]; JSON.stringify quotes the name safely
+_CLICK_GROUP_JS = """
+const el = document.querySelector('span[title=' + JSON.stringify(arguments[0]) + ']');
+if (el) { el.click(); return true; }
+return false;
+"""
+
+# Reads the last arguments[0] messages of the open conversation in one
+# round trip instead of several WebDriver calls per message
+_EXTRACT_MESSAGES_JS = """
+const out = [];
+const nodes = document.querySelectorAll("div[data-testid='msg-container']");
+const start = Math.max(0, nodes.length - arguments[0]);
+for (let i = start; i < nodes.length; i++) {
+    const node = nodes[i];
+    const content = node.querySelector("span.selectable-text");
+    if (!content) continue;
+    const sender = node.querySelector("span[data-testid='author']");
+    const time = node.querySelector("span[data-testid='msg-meta'] span");
+    const row = node.closest("[data-id]");
+    out.push({
+        id: row ? row.getAttribute("data-id") : null,
+        sender: sender ? sender.innerText : null,
+        content: content.innerText,
+        timestamp: time ? time.innerText : null
+    });
+}
+return out;
+"""
+
+# Reads the messages after the one whose row has data-id arguments[0], walking
+# back from the newest so only new messages are touched; null if that message
+# is no longer on the page
+_EXTRACT_MESSAGES_SINCE_JS = """
+const out = [];
+const nodes = document.querySelectorAll("div[data-testid='msg-container']");
+for (let i = nodes.length - 1; i >= 0; i--) {
+    const node = nodes[i];
+    const row = node.closest("[data-id]");
+    const id = row ? row.getAttribute("data-id") : null;
+    if (id === arguments[0]) return out.reverse();
+    const content = node.querySelector("span.selectable-text");
+    if (!content) continue;
+    const sender = node.querySelector("span[data-testid='author']");
+    const time = node.querySelector("span[data-testid='msg-meta'] span");
+    out.push({
+        id: id,
+        sender: sender ? sender.innerText : null,
+        content: content.innerText,
+        timestamp: time ? time.innerText : null
+    });
+}
+return null;
+"""
+
+# Queues messages added to the open conversation in window.__newMsgs, so
+# monitoring fetches only new messages in one round trip per poll
+_OBSERVE_MESSAGES_JS = """
+window.__newMsgs = [];
+window.__msgWaiter = null;
+const target = document.querySelector("div[data-testid='conversation-panel-messages']");
+new MutationObserver(mutations => {
+    for (const mutation of mutations) {
+        for (const node of mutation.addedNodes) {
+            if (!node.querySelector) continue;
+            const content = node.querySelector("span.selectable-text");
+            if (!content) continue;
+            const sender = node.querySelector("span[data-testid='author']");
+            const time = node.querySelector("span[data-testid='msg-meta'] span");
+            const row = node.closest ? node.closest("[data-id]") || node.querySelector("[data-id]") : null;
+            window.__newMsgs.push({
+                id: row ? row.getAttribute("data-id") : null,
+                sender: sender ? sender.innerText : null,
+                content: content.innerText,
+                timestamp: time ? time.innerText : null
+            });
+        }
+    }
+    if (window.__newMsgs.length && window.__msgWaiter) window.__msgWaiter();
+}).observe(target, {childList: true, subtree: true});
+"""
+
+# Async script: resolves with the queued messages as soon as any arrive, or
+# with an empty list after arguments[0] ms; null if the observer is gone
+# (page reloaded)
+_WAIT_MESSAGES_JS = """
+const done = arguments[arguments.length - 1];
+if (window.__newMsgs === undefined) { done(null); return; }
+const drain = () => {
+    window.__msgWaiter = null;
+    const messages = window.__newMsgs;
+    window.__newMsgs = [];
+    done(messages);
+};
+if (window.__newMsgs.length) { drain(); return; }
+const timer = setTimeout(drain, arguments[0]);
+window.__msgWaiter = () => { clearTimeout(timer); drain(); };
+"""
+
+# Longest a monitoring wait holds the browser session. chromedriver runs one
+# command per session at a time, so this also bounds how long another call
+# (get_groups from the API) can queue behind it.
+_MONITOR_WAIT_SECONDS = 5
+
+# Backoff after monitoring errors, doubling up to the maximum
+_MONITOR_RETRY_DELAY = 1
+_MONITOR_MAX_RETRY_DELAY = 60
+
+# Recent message ids (or (sender, content, time) keys when the page exposes
+# no id) remembered while monitoring. WhatsApp Web re-renders message nodes
+# on scroll, which the observer reports again.
+_MONITOR_SEEN_LIMIT = 500
+
+# Chrome profile inside the session directory, and the WhatsApp Web store in it
+# that holds the login; present once a QR code has been scanned
+_CHROME_PROFILE = "Default"
+_LOGIN_STORE = os.path.join(_CHROME_PROFILE, "IndexedDB", "https_web.whatsapp.com_0.indexeddb.leveldb")
+
+# Monitored messages kept for wait_for_messages(); oldest dropped when nobody
+# is draining them
+_PENDING_LIMIT = 500
+
+def _is_order_content(content: str, content_lower: str) -> bool:
+    """Determine if message text contains an order"""
+    # Order keywords first
+    if _ORDER_KEYWORDS_RE.search(content_lower) is not None:
+        return True
+
+    # Both quantity patterns need a digit; most chat messages have none
+    if _DIGIT_RE.search(content) is None:
+        return False
+
+    return _QUANTITY_RE.search(content_lower) is not None
+
+def _parse_order_items(content_lower: str) -> Tuple[Tuple[str, int], ...]:
+    """Extract (item, quantity) pairs from lowered message text"""
+    items_found = []
+
+    for match in _PRODUCT_RE.finditer(content_lower):
+        form = match.lastgroup[0]
+        item = match.group(f"{form}_item").strip()
+        quantity = int(match.group(f"{form}_qty"))
+        items_found.append((item.title(), quantity))
+
+    # If no structured pattern found, try to extract manually
+    if not items_found:
+        # Look for any numbers and nearby words
+        words = content_lower.split()
+        for i, word in enumerate(words):
+            if word.isdigit():
+                qty = int(word)
+                # Look for item names around the quantity
+                item_words = []
+                if i > 0:
+                    item_words.append(words[i-1])
+                if i < len(words) - 1:
+                    item_words.append(words[i+1])
+
+                if item_words:
+                    item = " ".join(item_words).strip(".,!?")
+                    items_found.append((item.title(), qty))
+                    break
+
+    # Tuples, so callers cannot mutate the cached result
+    return tuple(items_found)
+
+# Monitoring re-reads the same recent messages on every poll, so analysis is
+# memoized on content; it depends on nothing else
+@lru_cache(maxsize=4096)
+def _analyze_content(content: str) -> Tuple[bool, Tuple[Tuple[str, int], ...]]:
+    """Classify message text and, for orders, extract its items, lowering it once"""
+    content_lower = content.lower()
+    if not _is_order_content(content, content_lower):
+        return False, ()
+    return True, _parse_order_items(content_lower)
+
+def _classify_batch(contents: List[str]) -> List[Tuple[bool, Tuple[Tuple[str, int], ...]]]:
+    """Analyze many message texts; the analyzer is bound once outside the loop"""
+    analyze_content = _analyze_content
+    return [analyze_content(content) for content in contents]
+
+@dataclass
+class OrderMessage:
+    """An order message with its extracted (item, quantity) pairs"""
+    # Slots written out by hand; dataclass(slots=True) needs Python 3.10
+    __slots__ = ("id", "sender", "timestamp", "content", "items")
+    id: str
+    sender: str
+    timestamp: str
+    content: str
+    items: Tuple[Tuple[str, int], ...]
+
 class WhatsAppBot:
-    def __init__(self):
+    # Resolved once per process; ChromeDriverManager().install() checks the
+    # latest driver version over the network on every call
+    _driver_path: Optional[str] = None
+
+    def __init__(self, session_path: Optional[str] = None):
         self.driver = None
-        self.session_path = os.getenv("WHATSAPP_SESSION_PATH", "./whatsapp_sessions")
+        self.session_path = session_path or os.getenv("WHATSAPP_SESSION_PATH", "./whatsapp_sessions")
         self.headless = os.getenv("WHATSAPP_HEADLESS", "true").lower() == "true"
         self.is_connected = False
         self.current_group = None
         self.message_handlers = []
         
+        # Messages seen by start_monitoring, handed out by wait_for_messages()
+        self._pending = deque(maxlen=_PENDING_LIMIT)
+        self._new_message = asyncio.Event()
+        
+        # Id of the newest message read from the open chat; get_new_messages()
+        # reads only what came after it
+        self._last_seen_id = None
+        
+        # Selenium calls block for a full chromedriver round trip, so they run
+        # here instead of on the event loop. Two threads: a monitoring wait can
+        # hold one while API-driven calls use the other.
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="whatsapp-bot")
+        
         # Create session directory
         os.makedirs(self.session_path, exist_ok=True)
         
@@ -36,10 +289,27 @@ class WhatsAppBot:
         
         # Add user data directory for session persistence
         chrome_options.add_argument(f"--user-data-dir={self.session_path}")
+        chrome_options.add_argument(f"--profile-directory={_CHROME_PROFILE}")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--disable-features=VizDisplayCompositor")
+        # Chrome honours only the last --disable-features, so keep them in one list
+        chrome_options.add_argument("--disable-features=VizDisplayCompositor,Translate,BackForwardCache")
+        
+        # Only message text is read, so skip the work behind everything else
+        # on a session that stays open for days
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-sync")
+        chrome_options.add_argument("--disk-cache-size=1")
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--js-flags=--max-old-space-size=256")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2
+        })
         
         # User agent
         user_agent = os.getenv("WHATSAPP_USER_AGENT", 
@@ -50,13 +320,43 @@ class WhatsAppBot:
             chrome_options.add_argument("--headless")
         
         # Setup ChromeDriver
-        service = Service(ChromeDriverManager().install())
+        service = Service(self._get_driver_path())
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
         
+        # Selenium's client keeps a single pooled connection to chromedriver, so
+        # overlapping calls (monitoring plus an API-triggered get_groups) would
+        # reconnect each time. selenium 4.15 has no ClientConfig, so widen the pool
+        # on the executor directly.
+        executor = self.driver.command_executor
+        executor._conn = urllib3.PoolManager(
+            maxsize=WEBDRIVER_POOL_SIZE,
+            timeout=executor.get_timeout()
+        )
+        
         self.logger.info("Chrome WebDriver initialized")
 
+    def has_session(self) -> bool:
+        """Whether the session directory holds a saved WhatsApp Web login, so
+        connect() can skip the QR scan"""
+        return os.path.isdir(os.path.join(self.session_path, _LOGIN_STORE))
+
+    @classmethod
+    def _get_driver_path(cls) -> str:
+        """Path of the chromedriver binary, from CHROMEDRIVER_PATH or webdriver-manager"""
+        if cls._driver_path is None:
+            cls._driver_path = os.getenv("CHROMEDRIVER_PATH") or ChromeDriverManager().install()
+        return cls._driver_path
+
+    async def _in_executor(self, fn, *args):
+        """Run a blocking Selenium call on the bot's thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
     async def connect(self):
         """Connect to WhatsApp Web"""
+        return await self._in_executor(self._sync_connect)
+
+    def _sync_connect(self) -> bool:
+        """Blocking part of connect(); may wait up to a minute for a QR scan"""
         try:
             if not self.driver:
                 self.setup_driver()
@@ -100,36 +400,14 @@ class WhatsAppBot:
             await self.connect()
         
         try:
-            groups = []
-            
-            # Find all chat elements
-            chat_elements = self.driver.find_elements(
-                By.CSS_SELECTOR, 
-                "div[data-testid='chat-list'] > div"
-            )
-            
-            for chat in chat_elements:
-                try:
-                    # Get chat name
-                    name_element = chat.find_element(By.CSS_SELECTOR, "span[title]")
-                    group_name = name_element.get_attribute("title")
-                    
-                    # Check if it's a group (has group icon)
-                    try:
-                        chat.find_element(By.CSS_SELECTOR, "span[data-testid='default-group']")
-                        is_group = True
-                    except NoSuchElementException:
-                        is_group = False
-                    
-                    if is_group:
-                        groups.append({
-                            "name": group_name,
-                            "element": chat,
-                            "id": f"group_{len(groups)}"
-                        })
-                        
-                except Exception as e:
-                    continue
+            groups = [
+                {
+                    "name": chat["name"],
+                    "element": chat["element"],
+                    "id": f"group_{i}"
+                }
+                for i, chat in enumerate(await self._in_executor(self.driver.execute_script, _LIST_GROUPS_JS))
+            ]
             
             self.logger.info(f"Found {len(groups)} groups")
             return groups
@@ -141,19 +419,12 @@ class WhatsAppBot:
     async def select_group(self, group_name: str) -> bool:
         """Select a specific WhatsApp group"""
         try:
-            # Find and click the group
-            group_element = self.driver.find_element(
-                By.XPATH, 
-                f"//span[@title='{group_name}']"
-            )
-            group_element.click()
-            
-            # Wait for chat to load
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-testid='conversation-panel-messages']"))
-            )
+            if not await self._in_executor(self._sync_open_group, group_name):
+                self.logger.error(f"Group not found: {group_name}")
+                return False
             
             self.current_group = group_name
+            self._last_seen_id = None
             self.logger.info(f"✅ Selected group: {group_name}")
             return True
             
@@ -161,6 +432,18 @@ class WhatsAppBot:
             self.logger.error(f"Error selecting group {group_name}: {e}")
             return False
 
+    def _sync_open_group(self, group_name: str) -> bool:
+        """Click a group and wait for its chat to load; False if it isn't listed"""
+        # Find and click the group
+        if not self.driver.execute_script(_CLICK_GROUP_JS, group_name):
+            return False
+        
+        # Wait for chat to load
+        WebDriverWait(self.driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-testid='conversation-panel-messages']"))
+        )
+        return True
+
     async def get_messages(self, limit: int = 50) -> List[Dict]:
         """Get recent messages from current group"""
         if not self.current_group:
@@ -168,27 +451,9 @@ class WhatsAppBot:
             return []
         
         try:
-            messages = []
-            
-            # Scroll to load more messages
-            message_container = self.driver.find_element(
-                By.CSS_SELECTOR, 
-                "div[data-testid='conversation-panel-messages']"
-            )
-            
-            # Get message elements
-            message_elements = self.driver.find_elements(
-                By.CSS_SELECTOR, 
-                "div[data-testid='msg-container']"
-            )
-            
-            for msg_element in message_elements[-limit:]:
-                try:
-                    message_data = await self._parse_message(msg_element)
-                    if message_data:
-                        messages.append(message_data)
-                except Exception as e:
-                    continue
+            raw_messages = await self._in_executor(self.driver.execute_script, _EXTRACT_MESSAGES_JS, limit)
+            messages = self._build_messages(raw_messages)
+            self._advance_cursor(messages)
             
             self.logger.info(f"Retrieved {len(messages)} messages")
             return messages
@@ -197,183 +462,159 @@ class WhatsAppBot:
             self.logger.error(f"Error getting messages: {e}")
             return []
 
-    async def _parse_message(self, message_element) -> Optional[Dict]:
-        """Parse individual message element"""
-        try:
-            # Get sender name
-            try:
-                sender_element = message_element.find_element(
-                    By.CSS_SELECTOR, 
-                    "span[data-testid='author']"
-                )
-                sender = sender_element.text
-            except NoSuchElementException:
-                sender = "Unknown"
-            
-            # Get message content
-            try:
-                content_element = message_element.find_element(
-                    By.CSS_SELECTOR, 
-                    "span.selectable-text"
-                )
-                content = content_element.text
-            except NoSuchElementException:
-                return None
-            
-            # Get timestamp
-            try:
-                time_element = message_element.find_element(
-                    By.CSS_SELECTOR, 
-                    "span[data-testid='msg-meta'] span"
-                )
-                timestamp = time_element.text
-            except NoSuchElementException:
-                timestamp = datetime.now().strftime("%H:%M")
-            
-            # Check if message looks like an order
-            is_order = self._is_order_message(content)
-            
-            message_data = {
-                "id": f"msg_{datetime.now().timestamp()}",
-                "sender": sender,
-                "content": content,
-                "timestamp": timestamp,
-                "datetime": datetime.now(),
-                "is_order": is_order,
-                "group": self.current_group
-            }
-            
-            # Extract order data if it's an order
-            if is_order:
-                message_data["order_data"] = self._extract_order_data(content, sender)
-            
-            return message_data
-            
-        except Exception as e:
-            self.logger.error(f"Error parsing message: {e}")
-            return None
-
-    def _is_order_message(self, content: str) -> bool:
-        """Determine if message contains an order"""
-        # Order indicators
-        order_keywords = [
-            "order", "मंगवाना", "चाहिए", "want", "need", "book", 
-            "shirt", "jeans", "saree", "kurti", "dress", "पैंट", "शर्ट"
-        ]
+    async def get_messages_since(self, last_id: Optional[str], limit: int = 50) -> List[Dict]:
+        """Get messages newer than last_id from current group; with no last_id,
+        or once that message has scrolled out of the page, the latest limit"""
+        if not self.current_group:
+            self.logger.error("No group selected")
+            return []
         
-        # Quantity indicators
-        quantity_pattern = r'\b\d+\s*(piece|pc|pcs|पीस|pieces?)\b'
+        if last_id is None:
+            return await self.get_messages(limit=limit)
         
-        content_lower = content.lower()
+        try:
+            raw_messages = await self._in_executor(
+                self.driver.execute_script, _EXTRACT_MESSAGES_SINCE_JS, last_id
+            )
+        except Exception as e:
+            self.logger.error(f"Error getting messages: {e}")
+            return []
         
-        # Check for order keywords
-        has_order_keyword = any(keyword in content_lower for keyword in order_keywords)
+        if raw_messages is None:
+            return await self.get_messages(limit=limit)
+        messages = self._build_messages(raw_messages)
+        self._advance_cursor(messages)
+        return messages
+
+    async def get_order_messages(self, limit: int = 50) -> List[OrderMessage]:
+        """Get only the order messages among the recent ones in current group,
+        classified while they are read instead of as full message dicts"""
+        if not self.current_group:
+            self.logger.error("No group selected")
+            return []
         
-        # Check for quantity patterns
-        has_quantity = bool(re.search(quantity_pattern, content_lower))
+        try:
+            raw_messages = await self._in_executor(self.driver.execute_script, _EXTRACT_MESSAGES_JS, limit)
+        except Exception as e:
+            self.logger.error(f"Error getting messages: {e}")
+            return []
         
-        # Check for product + quantity pattern
-        product_quantity_pattern = r'\b\w+\s+\d+\b'
-        has_product_quantity = bool(re.search(product_quantity_pattern, content))
+        if raw_messages and raw_messages[-1].get("id"):
+            self._last_seen_id = raw_messages[-1]["id"]
         
-        return has_order_keyword or has_quantity or has_product_quantity
+        analyses = _classify_batch([raw["content"] for raw in raw_messages])
+        batch_ts = datetime.now().timestamp()
+        return [
+            OrderMessage(
+                id=raw.get("id") or f"msg_{batch_ts}_{seq}",
+                sender=raw["sender"] or "Unknown",
+                timestamp=raw["timestamp"] or "",
+                content=raw["content"],
+                items=items
+            )
+            for seq, (raw, (is_order, items)) in enumerate(zip(raw_messages, analyses))
+            if is_order
+        ]
 
-    def _extract_order_data(self, content: str, sender: str) -> Dict:
-        """Extract structured order data from message"""
-        order_data = {
+    async def get_new_messages(self, limit: int = 50) -> List[Dict]:
+        """Get messages that arrived since the last read from current group"""
+        return await self.get_messages_since(self._last_seen_id, limit=limit)
+
+    def _advance_cursor(self, messages: List[Dict]):
+        """Remember the newest message read"""
+        if messages:
+            self._last_seen_id = messages[-1]["id"]
+
+    def _build_messages(self, raw_messages: List[Dict]) -> List[Dict]:
+        """Build message dicts for a batch read from the page"""
+        # One clock read per batch; ids stay unique through the sequence number
+        now = datetime.now()
+        batch_ts = now.timestamp()
+        fallback_time = now.strftime("%H:%M")
+
+        analyses = _classify_batch([raw["content"] for raw in raw_messages])
+        return [
+            self._make_message(raw, is_order, items, batch_ts, seq, fallback_time)
+            for seq, (raw, (is_order, items)) in enumerate(zip(raw_messages, analyses))
+        ]
+
+    def _make_message(
+        self, raw: Dict, is_order: bool, items: Tuple[Tuple[str, int], ...],
+        batch_ts: float, seq: int, fallback_time: str
+    ) -> Dict:
+        """Build a message dict, with order data if it looks like an order"""
+        sender = raw["sender"] or "Unknown"
+        content = raw["content"]
+
+        message_data = {
+            # WhatsApp's own message id when the page exposes it
+            "id": raw.get("id") or f"msg_{batch_ts}_{seq}",
+            "sender": sender,
+            "content": content,
+            "timestamp": raw["timestamp"] or fallback_time,
+            "ts": batch_ts,
+            "is_order": is_order,
+            "group": self.current_group
+        }
+
+        # Extract order data if it's an order
+        if is_order:
+            message_data["order_data"] = self._extract_order_data(content, sender, items)
+
+        return message_data
+
+    def _is_order_message(self, content: str) -> bool:
+        """Determine if message contains an order"""
+        return _analyze_content(content)[0]
+
+    def _extract_order_data(
+        self, content: str, sender: str, items: Optional[Tuple[Tuple[str, int], ...]] = None
+    ) -> Dict:
+        """Extract structured order data from message; items may be passed in
+        when the message was already analyzed"""
+        if items is None:
+            items = _parse_order_items(content.lower())
+        return {
             "customer_name": sender,
-            "items": [],
+            "items": [
+                {"item": item, "quantity": quantity}
+                for item, quantity in items
+            ],
             "raw_message": content
         }
-        
-        # Common product patterns
-        product_patterns = [
-            # Pattern: "cotton shirt 5 pieces"
-            r'(\w+\s+\w+)\s+(\d+)\s*(?:piece|pc|pcs|पीस|pieces?)',
-            # Pattern: "5 cotton shirts"
-            r'(\d+)\s+(\w+\s+\w+)',
-            # Pattern: "shirt - 5"
-            r'(\w+)\s*[-:]\s*(\d+)',
-            # Pattern: "5x shirts"
-            r'(\d+)x?\s*(\w+)',
-        ]
-        
-        items_found = []
-        
-        for pattern in product_patterns:
-            matches = re.finditer(pattern, content, re.IGNORECASE)
-            for match in matches:
-                if len(match.groups()) == 2:
-                    if match.group(1).isdigit():
-                        quantity = int(match.group(1))
-                        item = match.group(2).strip()
-                    else:
-                        item = match.group(1).strip()
-                        quantity = int(match.group(2))
-                    
-                    items_found.append({
-                        "item": item.title(),
-                        "quantity": quantity
-                    })
-        
-        # If no structured pattern found, try to extract manually
-        if not items_found:
-            # Look for any numbers and nearby words
-            words = content.split()
-            for i, word in enumerate(words):
-                if word.isdigit():
-                    qty = int(word)
-                    # Look for item names around the quantity
-                    item_words = []
-                    if i > 0:
-                        item_words.append(words[i-1])
-                    if i < len(words) - 1:
-                        item_words.append(words[i+1])
-                    
-                    if item_words:
-                        item = " ".join(item_words).strip(".,!?")
-                        items_found.append({
-                            "item": item.title(),
-                            "quantity": qty
-                        })
-                        break
-        
-        order_data["items"] = items_found
-        return order_data
 
     async def export_chat(self, group_name: str, days: int = 7) -> Optional[str]:
         """Export chat data for a group"""
         try:
-            if not await self.select_group(group_name):
+            # Opening the chat again would reload it under any concurrent read
+            if self.current_group != group_name and not await self.select_group(group_name):
                 return None
             
             # Get messages
             messages = await self.get_messages(limit=1000)
             
             # Filter messages by date if needed
-            cutoff_date = datetime.now().timestamp() - (days * 24 * 60 * 60)
+            now = datetime.now()
+            cutoff_ts = now.timestamp() - (days * 24 * 60 * 60)
             recent_messages = [
                 msg for msg in messages 
-                if msg["datetime"].timestamp() > cutoff_date
+                if msg["ts"] > cutoff_ts
             ]
             
             # Create export data
             export_data = {
                 "group_name": group_name,
-                "export_date": datetime.now().isoformat(),
+                "export_date": now.isoformat(),
                 "message_count": len(recent_messages),
                 "order_count": len([msg for msg in recent_messages if msg["is_order"]]),
                 "messages": recent_messages
             }
             
             # Save to file
-            export_filename = f"whatsapp_export_{group_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            export_filename = f"whatsapp_export_{group_name}_{now.strftime('%Y%m%d_%H%M%S')}.json"
             export_path = os.path.join("./exports", export_filename)
             
-            os.makedirs("./exports", exist_ok=True)
-            
-            with open(export_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=2, default=str, ensure_ascii=False)
+            await self._in_executor(self._write_export, export_path, export_data)
             
             self.logger.info(f"✅ Chat exported to: {export_path}")
             return export_path
@@ -382,6 +623,14 @@ class WhatsAppBot:
             self.logger.error(f"Error exporting chat: {e}")
             return None
 
+    def _write_export(self, export_path: str, export_data: Dict):
+        """Write an export file"""
+        os.makedirs(os.path.dirname(export_path), exist_ok=True)
+        
+        # orjson writes UTF-8 and serializes datetimes natively
+        with open(export_path, 'wb') as f:
+            f.write(orjson.dumps(export_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
     async def start_monitoring(self, group_name: str, callback=None):
         """Start monitoring a group for new messages"""
         if not await self.select_group(group_name):
@@ -389,40 +638,70 @@ class WhatsAppBot:
         
         self.logger.info(f"🔄 Started monitoring group: {group_name}")
         
-        last_message_count = 0
+        # Only messages added after this point are reported
+        await self._in_executor(self.driver.execute_script, _OBSERVE_MESSAGES_JS)
+        await self._in_executor(self.driver.set_script_timeout, _MONITOR_WAIT_SECONDS + 5)
+        
+        retry_delay = _MONITOR_RETRY_DELAY
+        seen: OrderedDict = OrderedDict()
         
         while self.is_connected:
             try:
-                # Get current messages
-                messages = await self.get_messages(limit=10)
-                current_count = len(messages)
+                # Returns as soon as the observer sees a message
+                new_messages = await self._in_executor(
+                    self.driver.execute_async_script,
+                    _WAIT_MESSAGES_JS,
+                    _MONITOR_WAIT_SECONDS * 1000
+                )
+                if new_messages is None:
+                    # Observer lost with the page; reattach and carry on
+                    await self._in_executor(self.driver.execute_script, _OBSERVE_MESSAGES_JS)
+                    new_messages = []
                 
-                # Check for new messages
-                if current_count > last_message_count:
-                    new_messages = messages[last_message_count:]
-                    
-                    for message in new_messages:
-                        if message["is_order"] and callback:
-                            await callback(message)
-                    
-                    last_message_count = current_count
+                fresh = []
+                for raw in new_messages:
+                    key = raw.get("id") or (raw["sender"], raw["content"], raw["timestamp"])
+                    if key in seen:
+                        seen.move_to_end(key)
+                        continue
+                    seen[key] = None
+                    fresh.append(raw)
+                while len(seen) > _MONITOR_SEEN_LIMIT:
+                    seen.popitem(last=False)
                 
-                # Wait before next check
-                await asyncio.sleep(5)
+                for message in self._build_messages(fresh):
+                    self._pending.append(message)
+                    if message["is_order"] and callback:
+                        await callback(message)
+                if fresh:
+                    self._new_message.set()
+                
+                retry_delay = _MONITOR_RETRY_DELAY
                 
             except Exception as e:
                 self.logger.error(f"Error in monitoring: {e}")
-                await asyncio.sleep(10)
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, _MONITOR_MAX_RETRY_DELAY)
         
         return True
 
+    async def wait_for_messages(self) -> List[Dict]:
+        """Wait until start_monitoring sees new messages, then return them"""
+        await self._new_message.wait()
+        self._new_message.clear()
+        messages = list(self._pending)
+        self._pending.clear()
+        return messages
+
     async def close(self):
         """Close the WhatsApp bot"""
         if self.driver:
-            self.driver.quit()
+            await self._in_executor(self.driver.quit)
             self.is_connected = False
             self.logger.info("✅ WhatsApp bot closed")
 
+        _analyze_content.cache_clear()
+
 # Example usage and testing
 async def test_whatsapp_bot():
     """Test function for WhatsApp bot"""
@@ -181,7 +181,7 @@ setup_services() {
     if [ -f "$BACKEND_DIR/deployment/systemd/whatsapp-api.service" ]; then
         cp $BACKEND_DIR/deployment/systemd/*.service /etc/systemd/system/
         systemctl daemon-reload
-        systemctl enable whatsapp-api whatsapp-celery-worker whatsapp-celery-beat
+        systemctl enable whatsapp-api whatsapp-celery-worker whatsapp-celery-messages whatsapp-celery-bot whatsapp-celery-beat
     else
         warn "Service files not found. Please copy them manually from deployment/systemd/"
     fi
@@ -261,6 +261,8 @@ main() {
     log "Starting services..."
     systemctl start whatsapp-api
     systemctl start whatsapp-celery-worker
+    systemctl start whatsapp-celery-messages
+    systemctl start whatsapp-celery-bot
     systemctl start whatsapp-celery-beat
     
     log "Deployment completed successfully!"
@@ -274,6 +276,8 @@ main() {
     log "Service status:"
     systemctl status whatsapp-api --no-pager -l
     systemctl status whatsapp-celery-worker --no-pager -l
+    systemctl status whatsapp-celery-messages --no-pager -l
+    systemctl status whatsapp-celery-bot --no-pager -l
     systemctl status nginx --no-pager -l
 }
 
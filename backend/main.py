@@ -1,9 +1,11 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 import uvicorn
+import asyncio
 import os
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -11,23 +13,47 @@ load_dotenv()
 
 # Import routers
 from app.routers import orders, whatsapp, export, auth, summaries
-from app.database import engine, SessionLocal, test_connection
-from app.models import Base
-from app.whatsapp.bot import WhatsAppBot
+from app.database import engine, SessionLocal, schema_up_to_date, test_connection, warm_pool
+from app.models import Base, Order, OrderSummary
 from app.celery_config import celery_app
+from app.tasks import whatsapp_bot as bot_tasks
+from sqlalchemy import func
 
-# Test database connection
-if not test_connection():
-    print("❌ Database connection failed!")
-    exit(1)
+# Lock file that makes the workers of a multi-worker server set up the
+# schema one at a time
+SCHEMA_LOCK_FILE = os.getenv("SCHEMA_LOCK_FILE", "./migrations.lock")
 
-# Create database tables
-try:
-    Base.metadata.create_all(bind=engine)
+@contextmanager
+def _exclusive_lock(path: str):
+    """Hold an exclusive lock on path, waiting for it if another process has it"""
+    try:
+        import fcntl
+    except ImportError:
+        # No flock (Windows): single-process dev server, so just run
+        yield
+        return
+    with open(path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _ensure_schema():
+    """Create missing tables unless the database is at the latest migration"""
+    # Checked against the database itself, so a new or recreated database
+    # always gets its tables
+    if schema_up_to_date():
+        print("✅ Database schema is at the latest migration")
+        return
+    
+    # Workers that lose the lock wait for the winner, then find its tables
+    with _exclusive_lock(SCHEMA_LOCK_FILE):
+        try:
+            Base.metadata.create_all(bind=engine, checkfirst=True)
+        except Exception as e:
+            raise RuntimeError(f"❌ Database initialization failed: {e}")
     print("✅ Database tables created/verified")
-except Exception as e:
-    print(f"❌ Database initialization failed: {e}")
-    exit(1)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -80,18 +106,89 @@ async def health_check():
         "whatsapp": "ready"
     }
 
+# Longest a single /api/health/batch check may take
+HEALTH_CHECK_TIMEOUT = 10
+
+def _with_session(query):
+    """Run a database query function with its own session"""
+    db = SessionLocal()
+    try:
+        return query(db)
+    finally:
+        db.close()
+
+async def _check_whatsapp():
+    # Bound the thread's own wait; wait_for cannot stop a blocked result.get
+    result = bot_tasks.get_status.apply_async(expires=HEALTH_CHECK_TIMEOUT)
+    status = await asyncio.to_thread(result.get, timeout=HEALTH_CHECK_TIMEOUT)
+    return f"Connected: {status.get('connected')}"
+
+# Database checks run in threads so their blocking queries overlap the
+# other checks instead of stalling the event loop
+async def _check_orders():
+    total = await asyncio.to_thread(
+        _with_session, lambda db: db.query(func.count(Order.id)).scalar()
+    )
+    return f"Found {total} orders"
+
+async def _check_export():
+    return (await export.list_export_files()).message
+
+async def _check_summary():
+    latest = await asyncio.to_thread(
+        _with_session, lambda db: db.query(func.max(OrderSummary.created_at)).scalar()
+    )
+    return f"Latest summary: {latest.isoformat() if latest else 'none'}"
+
+# Cheap checks /api/health/batch can run; the full routes are probed on their own
+HEALTH_CHECKS = {
+    "whatsapp": _check_whatsapp,
+    "orders": _check_orders,
+    "export": _check_export,
+    "summary": _check_summary,
+}
+
+async def _run_health_check(name: str):
+    try:
+        detail = await asyncio.wait_for(HEALTH_CHECKS[name](), HEALTH_CHECK_TIMEOUT)
+    except HTTPException as e:
+        return {"status": "error", "detail": e.detail}
+    except asyncio.TimeoutError:
+        return {"status": "error", "detail": f"Timed out after {HEALTH_CHECK_TIMEOUT}s"}
+    except Exception as e:
+        return {"status": "error", "detail": str(e)}
+    return {"status": "ok", "detail": detail}
+
+@app.get("/api/health/batch")
+async def health_check_batch(
+    checks: str = Query(",".join(HEALTH_CHECKS)),
+    current_user = Depends(auth.get_current_active_user)
+):
+    """Run several health checks in one request, e.g. ?checks=whatsapp,orders"""
+    names = [name.strip() for name in checks.split(",") if name.strip()]
+    unknown = [name for name in names if name not in HEALTH_CHECKS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown checks: {', '.join(unknown)}")
+    
+    results = await asyncio.gather(*(_run_health_check(name) for name in names))
+    return dict(zip(names, results))
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     print("🚀 WhatsApp Order API starting up...")
     
-    # Initialize WhatsApp bot
-    try:
-        whatsapp_bot = WhatsAppBot()
-        app.state.whatsapp_bot = whatsapp_bot
-        print("✅ WhatsApp bot initialized")
-    except Exception as e:
-        print(f"❌ WhatsApp bot initialization failed: {e}")
+    # Runs per worker after the fork rather than once at import in the parent
+    if not test_connection():
+        raise RuntimeError("❌ Database connection failed!")
+    
+    await asyncio.to_thread(_ensure_schema)
+    
+    # Fill the pool before this worker accepts traffic
+    await asyncio.to_thread(warm_pool)
+    
+    # The WhatsApp bot runs in the Celery worker on the "whatsapp" queue
+    # (app.tasks.whatsapp_bot), so API workers don't each start Chrome
     
     print("✅ API server started successfully!")
 
@@ -99,15 +196,6 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     print("🛑 Shutting down API server...")
-    
-    # Clean up WhatsApp bot
-    if hasattr(app.state, 'whatsapp_bot'):
-        try:
-            await app.state.whatsapp_bot.close()
-            print("✅ WhatsApp bot closed")
-        except Exception as e:
-            print(f"❌ Error closing WhatsApp bot: {e}")
-    
     print("✅ API server shutdown complete!")
 
 if __name__ == "__main__":
@@ -7,79 +7,143 @@ Handles pre-flight checks, database initialization, and service startup
 import os
 import sys
 import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
+import threading
 from datetime import datetime
-from pathlib import Path
 
 # Add the app directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import engine, test_connection, SessionLocal
-from app.models import Base, User
-from passlib.context import CryptContext
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/startup.log'),
-        logging.StreamHandler()
-    ]
-)
+import orjson
+from dotenv import load_dotenv
+
+# app.database, app.models and passlib are imported inside the checks that
+# use them, so their imports overlap in the check threads
+load_dotenv()
+
+# Human-readable format, used for the console when it is a terminal
+TTY_FMT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, with an epoch timestamp instead of strftime;
+    tracebacks are already folded into the message by the QueueHandler"""
+    def format(self, record):
+        return orjson.dumps({
+            't': record.created,
+            'lvl': record.levelname,
+            'name': record.name,
+            'msg': record.getMessage()
+        }).decode()
+
+
+# Configure logging: records go onto a queue and a listener thread writes
+# them, so checks never wait on log file I/O
+def _configure_logging():
+    os.makedirs('logs', exist_ok=True)
+    file_handler = logging.FileHandler('logs/startup.log')
+    file_handler.setFormatter(JSONFormatter())
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter(TTY_FMT) if sys.stderr.isatty() else JSONFormatter()
+    )
+    handlers = [file_handler, stream_handler]
+    
+    log_queue = queue.SimpleQueue()
+    # The queue carries the bare message; the listener's handlers format it
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(message)s',
+        handlers=[logging.handlers.QueueHandler(log_queue)]
+    )
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    # Flush queued records on exit, including sys.exit() after failed checks
+    atexit.register(listener.stop)
+
+_configure_logging()
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Snapshot of the environment, taken after .env is loaded;
+# checks read this plain dict instead of going through os.environ
+ENV = dict(os.environ)
+
+
+def refresh_env_cache():
+    """Re-read the environment into ENV"""
+    ENV.clear()
+    ENV.update(os.environ)
+
+
+# Environment variables the backend cannot run without
+REQUIRED_VARS = frozenset({
+    'DATABASE_URL',
+    'SECRET_KEY',
+    'CELERY_BROKER_URL',
+    'CELERY_RESULT_BACKEND'
+})
 
 
 def check_environment():
     """Check if all required environment variables are set"""
-    required_vars = [
-        'DATABASE_URL',
-        'SECRET_KEY',
-        'CELERY_BROKER_URL',
-        'CELERY_RESULT_BACKEND'
-    ]
-    
-    missing_vars = []
-    for var in required_vars:
-        if not os.getenv(var):
-            missing_vars.append(var)
+    # Unset variables, then set-but-empty ones
+    missing_vars = REQUIRED_VARS.difference(ENV)
+    missing_vars |= {var for var in REQUIRED_VARS - missing_vars if not ENV[var]}
     
     if missing_vars:
-        logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
+        logger.error(f"Missing required environment variables: {', '.join(sorted(missing_vars))}")
         return False
     
     logger.info("✅ All required environment variables are set")
     return True
 
 
+# Directories the backend writes to, relative to the working directory
+DIRECTORIES = (
+    'logs',
+    'exports',
+    'static',
+    'whatsapp_sessions',
+    'uploads',
+    'backups'
+)
+
+
 def create_directories():
     """Create necessary directories if they don't exist"""
-    directories = [
-        'logs',
-        'exports',
-        'static',
-        'whatsapp_sessions',
-        'uploads',
-        'backups'
-    ]
+    # One directory listing instead of a stat and mkdir per directory
+    with os.scandir('.') as entries:
+        existing = {entry.name for entry in entries if entry.is_dir()}
+    
+    missing = [directory for directory in DIRECTORIES if directory not in existing]
+    for directory in missing:
+        os.makedirs(directory, exist_ok=True)
     
-    for directory in directories:
-        Path(directory).mkdir(exist_ok=True)
-        logger.info(f"✅ Directory created/verified: {directory}")
+    logger.info(f"✅ Directories created/verified ({len(missing)} created)")
+    return True
 
 
 def test_database():
     """Test database connection and create tables"""
     logger.info("Testing database connection...")
     
+    from app.database import engine, schema_up_to_date, test_connection
+    from app.models import Base
+    
     if not test_connection():
         logger.error("❌ Database connection failed!")
         return False
     
     logger.info("✅ Database connection successful")
     
+    # One query instead of a catalog lookup per table when migrations are current
+    if schema_up_to_date():
+        logger.info("✅ Database schema is at the latest migration")
+        return True
+    
     try:
         # Create tables
         Base.metadata.create_all(bind=engine)
@@ -90,16 +154,35 @@ def test_database():
         return False
 
 
+# Password hashing context, created the first time an admin is created;
+# warm restarts find the admin and never load bcrypt
+_pwd_context = None
+
+
+def _get_pwd_context():
+    """Get the password hashing context (created on first use)"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
 def create_default_admin():
     """Create default admin user if it doesn't exist"""
+    from app.database import SessionLocal
+    from app.models import User
+    
     db = SessionLocal()
     try:
-        # Check if admin user exists
-        admin_user = db.query(User).filter(User.username == "admin").first()
+        # Check if admin user exists; EXISTS returns one boolean, not a user row
+        admin_exists = db.query(
+            db.query(User.id).filter(User.username == "admin").exists()
+        ).scalar()
         
-        if not admin_user:
+        if not admin_exists:
             # Create admin user
-            hashed_password = pwd_context.hash("admin123")
+            hashed_password = _get_pwd_context().hash("admin123")
             admin_user = User(
                 username="admin",
                 email="admin@whatsapp-orders.local",
@@ -127,10 +210,15 @@ def test_redis():
     """Test Redis connection"""
     try:
         import redis
-        redis_url = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/1')
-        r = redis.from_url(redis_url)
-        r.ping()
-        logger.info("✅ Redis connection successful")
+        redis_url = ENV.get('CELERY_BROKER_URL', 'redis://localhost:6379/1')
+        r = redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+        # Connectivity and server version in one round trip
+        pipe = r.pipeline(transaction=False)
+        pipe.ping()
+        pipe.info('server')
+        _, info = pipe.execute()
+        r.close()
+        logger.info(f"✅ Redis connection successful (Redis {info.get('redis_version', 'unknown')})")
         return True
     except Exception as e:
         logger.error(f"❌ Redis connection failed: {e}")
@@ -148,42 +236,101 @@ def check_celery():
         return False
 
 
-def run_pre_flight_checks():
+async def _run_check(check_name, check_func):
+    """Run one blocking check in a worker thread; True if it passed"""
+    logger.info("Running check: %s", check_name)
+    try:
+        result = await asyncio.to_thread(check_func)
+    except Exception as e:
+        logger.error("❌ Check crashed: %s - %s", check_name, e)
+        return False
+    
+    if not result:
+        logger.error("❌ Check failed: %s", check_name)
+        return False
+    
+    logger.info("✅ Check passed: %s", check_name)
+    return True
+
+
+# Checks the API can start without; with --fast-start they run in the
+# background and only log failures
+DEFERRABLE_CHECKS = ("Redis Connection", "Celery Configuration")
+
+
+async def _run_pre_flight_checks(check_names):
+    """Run the checks concurrently; only the admin user waits for the database"""
+    check_funcs = {
+        "Environment Variables": check_environment,
+        "Directory Creation": create_directories,
+        "Redis Connection": test_redis,
+        "Celery Configuration": check_celery,
+    }
+    results = {}
+    
+    async def check(check_name, check_func):
+        results[check_name] = await _run_check(check_name, check_func)
+        return results[check_name]
+    
+    async def database_then_admin():
+        if await check("Database Connection", test_database):
+            await check("Default Admin User", create_default_admin)
+        else:
+            logger.error("❌ Check skipped: Default Admin User (database unavailable)")
+            results["Default Admin User"] = False
+    
+    checks = [
+        check(check_name, check_func)
+        for check_name, check_func in check_funcs.items()
+        if check_name in check_names
+    ]
+    if "Database Connection" in check_names:
+        checks.append(database_then_admin())
+    
+    await asyncio.gather(*checks)
+    return results
+
+
+def _run_deferred_checks(check_names):
+    """Run non-critical checks in a background thread, logging failures"""
+    def run():
+        results = asyncio.run(_run_pre_flight_checks(check_names))
+        failed_checks = [name for name in check_names if not results[name]]
+        if failed_checks:
+            logger.warning(f"⚠️  Deferred checks failed: {', '.join(failed_checks)}")
+        else:
+            logger.info("✅ Deferred checks passed")
+    
+    threading.Thread(target=run, name="deferred-checks", daemon=True).start()
+
+
+def run_pre_flight_checks(fast_start: bool = False):
     """Run all pre-flight checks"""
     logger.info("🚀 Starting WhatsApp Order Backend pre-flight checks...")
     
-    checks = [
-        ("Environment Variables", check_environment),
-        ("Directory Creation", create_directories),
-        ("Database Connection", test_database),
-        ("Redis Connection", test_redis),
-        ("Celery Configuration", check_celery),
-        ("Default Admin User", create_default_admin),
+    check_names = [
+        "Environment Variables",
+        "Directory Creation",
+        "Database Connection",
+        "Redis Connection",
+        "Celery Configuration",
+        "Default Admin User",
     ]
     
-    failed_checks = []
-    
-    for check_name, check_func in checks:
-        logger.info(f"Running check: {check_name}")
-        try:
-            if callable(check_func):
-                result = check_func()
-            else:
-                result = check_func
-            
-            if not result:
-                failed_checks.append(check_name)
-                logger.error(f"❌ Check failed: {check_name}")
-            else:
-                logger.info(f"✅ Check passed: {check_name}")
-        except Exception as e:
-            failed_checks.append(check_name)
-            logger.error(f"❌ Check crashed: {check_name} - {e}")
+    if fast_start:
+        check_names = [name for name in check_names if name not in DEFERRABLE_CHECKS]
+    
+    # Startup takes as long as the slowest check rather than the sum of them
+    results = asyncio.run(_run_pre_flight_checks(check_names))
+    failed_checks = [name for name in check_names if not results[name]]
     
     if failed_checks:
         logger.error(f"❌ Pre-flight checks failed: {', '.join(failed_checks)}")
         return False
     
+    if fast_start:
+        _run_deferred_checks(DEFERRABLE_CHECKS)
+    
     logger.info("🎉 All pre-flight checks passed!")
     return True
 
@@ -191,20 +338,24 @@ def run_pre_flight_checks():
 def start_production_server():
     """Start the production server with uvicorn"""
     import uvicorn
-    from main import app
     
     # Get configuration from environment
-    host = os.getenv('API_HOST', '0.0.0.0')
-    port = int(os.getenv('API_PORT', 8000))
-    workers = int(os.getenv('API_WORKERS', 4))
+    host = ENV.get('API_HOST', '0.0.0.0')
+    port = int(ENV.get('API_PORT', 8000))
+    workers = int(ENV.get('API_WORKERS', 4))
     
     logger.info(f"🚀 Starting production server on {host}:{port} with {workers} workers")
     
+    # Workers import main:app themselves, so the parent doesn't. uvloop and
+    # httptools come with uvicorn[standard]; pin them so a missing one fails
+    # loudly instead of silently falling back to asyncio and h11.
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
         workers=workers,
+        loop="uvloop",
+        http="httptools",
         log_level="info",
         access_log=True,
         reload=False
@@ -220,8 +371,10 @@ def main():
     logger.info(f"📁 Working Directory: {os.getcwd()}")
     logger.info("=" * 80)
     
-    # Run pre-flight checks
-    if not run_pre_flight_checks():
+    # Run pre-flight checks; --fast-start doesn't wait for Redis and Celery,
+    # except in check-only mode where every check must report
+    fast_start = '--fast-start' in sys.argv and '--check-only' not in sys.argv
+    if not run_pre_flight_checks(fast_start=fast_start):
         logger.error("❌ Startup failed due to pre-flight check failures")
         sys.exit(1)
     
@@ -5,6 +5,105 @@ from datetime import datetime
 
 BASE_URL = "http://localhost:8000"
 
+# One pooled client serves every test, so connections are reused
+CLIENT_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=16)
+
+# Each test returns its output lines; tests run concurrently and their output
+# is printed afterwards in test order so it doesn't interleave
+
+async def _test_health(client):
+    response = await client.get("/api/health")
+    return [
+        "\n🔍 Test 1: Health Check",
+        f"Status: {response.status_code}",
+        f"Response: {response.json()}"
+    ]
+
+async def _test_whatsapp_status(client):
+    response = await client.get("/api/whatsapp/status")
+    return [
+        "\n📱 Test 2: WhatsApp Status",
+        f"Status: {response.status_code}",
+        f"Response: {response.json()}"
+    ]
+
+async def _test_whatsapp_flow(client):
+    """Connect, list groups, then select the first group and read its messages"""
+    lines = ["\n🔗 Test 3: Connect to WhatsApp"]
+    response = await client.post("/api/whatsapp/connect")
+    lines.append(f"Status: {response.status_code}")
+    lines.append(f"Response: {response.json()}")
+    
+    lines.append("\n📋 Test 4: Get WhatsApp Groups")
+    response = await client.get("/api/whatsapp/groups")
+    lines.append(f"Status: {response.status_code}")
+    result = response.json()
+    lines.append(f"Found {len(result.get('data', []))} groups")
+    
+    # Store first group ID for testing
+    groups = result.get('data', [])
+    group_id = groups[0]['id'] if groups else None
+    
+    if group_id:
+        lines.append(f"\n🎯 Test 5: Select Group (ID: {group_id})")
+        response = await client.post(f"/api/whatsapp/groups/{group_id}/select")
+        lines.append(f"Status: {response.status_code}")
+        lines.append(f"Response: {response.json()}")
+        
+        lines.append(f"\n📨 Test 6: Get Group Messages")
+        response = await client.get(f"/api/whatsapp/groups/{group_id}/messages?limit=10")
+        lines.append(f"Status: {response.status_code}")
+        result = response.json()
+        if result.get('success'):
+            messages = result.get('data', {}).get('messages', [])
+            lines.append(f"Retrieved {len(messages)} messages")
+            order_count = result.get('data', {}).get('order_messages', 0)
+            lines.append(f"Order messages: {order_count}")
+    
+    return lines
+
+async def _test_orders(client):
+    response = await client.get("/api/orders?page=1&size=10")
+    result = response.json()
+    return [
+        "\n📊 Test 7: Get Orders",
+        f"Status: {response.status_code}",
+        f"Total orders: {result.get('total', 0)}"
+    ]
+
+async def _test_dashboard(client):
+    lines = ["\n📈 Test 8: Dashboard Statistics"]
+    response = await client.get("/api/orders/statistics/dashboard")
+    lines.append(f"Status: {response.status_code}")
+    result = response.json()
+    if result.get('success'):
+        stats = result.get('data', {})
+        lines.append(f"Total Orders: {stats.get('total_orders', 0)}")
+        lines.append(f"Total Customers: {stats.get('total_customers', 0)}")
+        lines.append(f"Most Ordered Item: {stats.get('most_ordered_item', 'N/A')}")
+    return lines
+
+async def _test_summary(client):
+    lines = ["\n📋 Test 9: Generate Summary"]
+    response = await client.get("/api/summaries/generate")
+    lines.append(f"Status: {response.status_code}")
+    result = response.json()
+    if result.get('success'):
+        summary = result.get('data', {})
+        lines.append(f"Total Customers: {summary.get('total_customers', 0)}")
+        lines.append(f"Total Items: {summary.get('total_items', 0)}")
+    return lines
+
+async def _test_export_files(client):
+    lines = ["\n📤 Test 10: List Export Files"]
+    response = await client.get("/api/export/files")
+    lines.append(f"Status: {response.status_code}")
+    result = response.json()
+    if result.get('success'):
+        files = result.get('data', [])
+        lines.append(f"Available export files: {len(files)}")
+    return lines
+
 async def test_api_endpoints():
     """
     Test all FastAPI endpoints
@@ -12,91 +111,20 @@ async def test_api_endpoints():
     print("🚀 Testing WhatsApp Order API")
     print("=" * 40)
     
-    async with httpx.AsyncClient() as client:
+    async with httpx.AsyncClient(base_url=BASE_URL, limits=CLIENT_LIMITS, timeout=10.0) as client:
         try:
-            # Test 1: Health check
-            print("\n🔍 Test 1: Health Check")
-            response = await client.get(f"{BASE_URL}/api/health")
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.json()}")
-            
-            # Test 2: WhatsApp status
-            print("\n📱 Test 2: WhatsApp Status")
-            response = await client.get(f"{BASE_URL}/api/whatsapp/status")
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.json()}")
-            
-            # Test 3: Connect to WhatsApp (if not connected)
-            print("\n🔗 Test 3: Connect to WhatsApp")
-            response = await client.post(f"{BASE_URL}/api/whatsapp/connect")
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.json()}")
-            
-            # Test 4: Get WhatsApp groups
-            print("\n📋 Test 4: Get WhatsApp Groups")
-            response = await client.get(f"{BASE_URL}/api/whatsapp/groups")
-            print(f"Status: {response.status_code}")
-            result = response.json()
-            print(f"Found {len(result.get('data', []))} groups")
-            
-            # Store first group ID for testing
-            groups = result.get('data', [])
-            group_id = groups[0]['id'] if groups else None
-            
-            if group_id:
-                # Test 5: Select group
-                print(f"\n🎯 Test 5: Select Group (ID: {group_id})")
-                response = await client.post(f"{BASE_URL}/api/whatsapp/groups/{group_id}/select")
-                print(f"Status: {response.status_code}")
-                print(f"Response: {response.json()}")
-                
-                # Test 6: Get group messages
-                print(f"\n📨 Test 6: Get Group Messages")
-                response = await client.get(f"{BASE_URL}/api/whatsapp/groups/{group_id}/messages?limit=10")
-                print(f"Status: {response.status_code}")
-                result = response.json()
-                if result.get('success'):
-                    messages = result.get('data', {}).get('messages', [])
-                    print(f"Retrieved {len(messages)} messages")
-                    order_count = result.get('data', {}).get('order_messages', 0)
-                    print(f"Order messages: {order_count}")
-            
-            # Test 7: Get orders from database
-            print("\n📊 Test 7: Get Orders")
-            response = await client.get(f"{BASE_URL}/api/orders?page=1&size=10")
-            print(f"Status: {response.status_code}")
-            result = response.json()
-            print(f"Total orders: {result.get('total', 0)}")
-            
-            # Test 8: Dashboard statistics
-            print("\n📈 Test 8: Dashboard Statistics")
-            response = await client.get(f"{BASE_URL}/api/orders/statistics/dashboard")
-            print(f"Status: {response.status_code}")
-            result = response.json()
-            if result.get('success'):
-                stats = result.get('data', {})
-                print(f"Total Orders: {stats.get('total_orders', 0)}")
-                print(f"Total Customers: {stats.get('total_customers', 0)}")
-                print(f"Most Ordered Item: {stats.get('most_ordered_item', 'N/A')}")
-            
-            # Test 9: Generate summary
-            print("\n📋 Test 9: Generate Summary")
-            response = await client.get(f"{BASE_URL}/api/summaries/generate")
-            print(f"Status: {response.status_code}")
-            result = response.json()
-            if result.get('success'):
-                summary = result.get('data', {})
-                print(f"Total Customers: {summary.get('total_customers', 0)}")
-                print(f"Total Items: {summary.get('total_items', 0)}")
-            
-            # Test 10: List export files
-            print("\n📤 Test 10: List Export Files")
-            response = await client.get(f"{BASE_URL}/api/export/files")
-            print(f"Status: {response.status_code}")
-            result = response.json()
-            if result.get('success'):
-                files = result.get('data', [])
-                print(f"Available export files: {len(files)}")
+            # Only the WhatsApp flow has steps that depend on each other
+            outputs = await asyncio.gather(
+                _test_health(client),
+                _test_whatsapp_status(client),
+                _test_whatsapp_flow(client),
+                _test_orders(client),
+                _test_dashboard(client),
+                _test_summary(client),
+                _test_export_files(client)
+            )
+            for lines in outputs:
+                print("\n".join(lines))
             
             print("\n✅ API testing completed successfully!")
             print("\nAPI Documentation available at:")
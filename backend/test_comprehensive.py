@@ -4,13 +4,16 @@ Comprehensive test script for WhatsApp Order Backend
 Tests all major API endpoints and functionality
 """
 
+import argparse
 import asyncio
 import aiohttp
-import json
+import orjson
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 # Test configuration
 BASE_URL = "http://localhost:8000"
@@ -20,6 +23,53 @@ TEST_USER = {
     "password": "testpass123"
 }
 
+# Login needs the registered user, and the authenticated tests need the
+# token, so these run in order within one tester
+AUTH_PHASES = [
+    ["test_user_registration"],
+    ["test_user_login"],
+    ["test_protected_endpoint", "test_orders_endpoint", "test_health_batch"]
+]
+
+# Tests with no dependencies, spread across workers
+INDEPENDENT_TESTS = [
+    "test_health_check",
+    "test_api_docs",
+    "test_whatsapp_status",
+    "test_webhook_endpoint",
+    "test_export_endpoints",
+    "test_summary_generation"
+]
+
+def _shard_phases(workers: int) -> List[List[List[str]]]:
+    """Split the tests into one list of phases per worker; the first worker
+    also runs the authentication chain"""
+    shards = [[list(phase) for phase in AUTH_PHASES]] + [[[]] for _ in range(workers - 1)]
+    for i, test_name in enumerate(INDEPENDENT_TESTS):
+        shards[i % workers][0].append(test_name)
+    return shards
+
+def print_summary(passed: int, failed: int):
+    """Print the pass/fail totals"""
+    print("\n" + "=" * 60)
+    print(f"📊 Test Results: {passed} passed, {failed} failed")
+    
+    if failed == 0:
+        print("🎉 All tests passed! Your API is ready for production.")
+    else:
+        print(f"⚠️  Some tests failed. Please check the logs above.")
+
+# (epoch second, ISO string) of the last timestamp formatted by _now_iso
+_iso_cache = (0, "")
+
+def _now_iso() -> str:
+    """Current UTC time as ISO 8601, formatted at most once per second"""
+    global _iso_cache
+    now = int(time.time())
+    if _iso_cache[0] != now:
+        _iso_cache = (now, datetime.utcfromtimestamp(now).isoformat())
+    return _iso_cache[1]
+
 class WhatsAppAPITester:
     def __init__(self, base_url: str):
         self.base_url = base_url
@@ -28,7 +78,19 @@ class WhatsAppAPITester:
         self.test_results = []
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        # Tests run concurrently, so keep enough pooled connections for all of
+        # them; cache DNS and keep connections alive for remote base URLs
+        connector = aiohttp.TCPConnector(
+            limit=20,
+            limit_per_host=20,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+            enable_cleanup_closed=True
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=15)
+        )
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -42,7 +104,7 @@ class WhatsAppAPITester:
             "test": test_name,
             "success": success,
             "message": message,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": _now_iso()
         })
 
     async def test_health_check(self):
@@ -186,7 +248,7 @@ class WhatsAppAPITester:
                     "sender_name": "Test User",
                     "message_content": "Test order: 2x Pizza, 1x Coke",
                     "message_type": "text",
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": _now_iso()
                 }
             }
 
@@ -237,48 +299,62 @@ class WhatsAppAPITester:
             self.log_test("Summary Generation", False, f"Error: {str(e)}")
             return False
 
+    async def test_health_batch(self):
+        """Test the authenticated batch health check"""
+        if not self.access_token:
+            self.log_test("Health Batch", False, "No access token available")
+            return False
+
+        try:
+            headers = {"Authorization": f"Bearer {self.access_token}"}
+            async with self.session.get(
+                f"{self.base_url}/api/health/batch",
+                headers=headers
+            ) as response:
+                if response.status != 200:
+                    self.log_test("Health Batch", False, f"Status: {response.status}")
+                    return False
+                data = await response.json()
+        except Exception as e:
+            self.log_test("Health Batch", False, f"Error: {str(e)}")
+            return False
+
+        failed = [name for name, result in data.items() if result.get("status") != "ok"]
+        if failed:
+            self.log_test("Health Batch", False, f"Failed checks: {', '.join(failed)}")
+            return False
+        self.log_test("Health Batch", True, f"Checks passed: {', '.join(data)}")
+        return True
+
+    async def _run_tests(self, tests) -> list:
+        """Run independent tests concurrently; a crash counts as a failure"""
+        results = await asyncio.gather(*(test() for test in tests), return_exceptions=True)
+        outcomes = []
+        for test, result in zip(tests, results):
+            if isinstance(result, Exception):
+                print(f"❌ Test {test.__name__} crashed: {result}")
+                result = False
+            outcomes.append(bool(result))
+        return outcomes
+
+    async def run_tests(self, phases: List[List[str]]) -> List[bool]:
+        """Run phases of tests in order, each phase's tests concurrently"""
+        outcomes = []
+        for test_names in phases:
+            tests = [getattr(self, test_name) for test_name in test_names]
+            outcomes.extend(await self._run_tests(tests))
+        return outcomes
+
     async def run_all_tests(self):
-        """Run all tests in sequence"""
+        """Run all tests, concurrently where they don't depend on each other"""
         print("🧪 Starting WhatsApp Order Backend API Tests")
         print("=" * 60)
 
-        tests = [
-            self.test_health_check,
-            self.test_api_docs,
-            self.test_user_registration,
-            self.test_user_login,
-            self.test_protected_endpoint,
-            self.test_orders_endpoint,
-            self.test_whatsapp_status,
-            self.test_webhook_endpoint,
-            self.test_export_endpoints,
-            self.test_summary_generation
-        ]
-
-        passed = 0
-        failed = 0
-
-        for test in tests:
-            try:
-                result = await test()
-                if result:
-                    passed += 1
-                else:
-                    failed += 1
-            except Exception as e:
-                print(f"❌ Test {test.__name__} crashed: {e}")
-                failed += 1
-
-            # Small delay between tests
-            await asyncio.sleep(0.5)
+        outcomes = await self.run_tests(_shard_phases(1)[0])
 
-        print("\n" + "=" * 60)
-        print(f"📊 Test Results: {passed} passed, {failed} failed")
-        
-        if failed == 0:
-            print("🎉 All tests passed! Your API is ready for production.")
-        else:
-            print(f"⚠️  Some tests failed. Please check the logs above.")
+        passed = outcomes.count(True)
+        failed = outcomes.count(False)
+        print_summary(passed, failed)
 
         return failed == 0
 
@@ -295,25 +371,66 @@ class WhatsAppAPITester:
             "results": self.test_results
         }
         
-        with open(filename, 'w') as f:
-            json.dump(report, f, indent=2)
+        # Write to a temporary file and rename, so an interrupted run never
+        # leaves a half-written report
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, 'wb') as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_filename, filename)
         
         print(f"\n📄 Test report saved to {filename}")
 
 
+def _run_shard(base_url: str, phases: List[List[str]]):
+    """Run one worker's tests in its own process and event loop"""
+    async def run():
+        async with WhatsAppAPITester(base_url) as tester:
+            outcomes = await tester.run_tests(phases)
+            return outcomes, tester.test_results
+
+    return asyncio.run(run())
+
+
 async def main():
     """Main test function"""
-    if len(sys.argv) > 1:
-        base_url = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Test the WhatsApp Order Backend API")
+    parser.add_argument("base_url", nargs="?", default=BASE_URL)
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes to spread the tests across (for example os.cpu_count())"
+    )
+    args = parser.parse_args()
+    base_url = args.base_url
+
+    if args.workers <= 1:
+        async with WhatsAppAPITester(base_url) as tester:
+            success = await tester.run_all_tests()
+            tester.save_test_report()
     else:
-        base_url = BASE_URL
+        print(f"🧪 Starting WhatsApp Order Backend API Tests ({args.workers} workers)")
+        print("=" * 60)
 
-    async with WhatsAppAPITester(base_url) as tester:
-        success = await tester.run_all_tests()
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(args.workers) as pool:
+            shard_results = await asyncio.gather(*(
+                loop.run_in_executor(pool, _run_shard, base_url, phases)
+                for phases in _shard_phases(args.workers)
+            ))
+
+        # Merge the workers' results into one report
+        tester = WhatsAppAPITester(base_url)
+        outcomes = []
+        for shard_outcomes, shard_test_results in shard_results:
+            outcomes.extend(shard_outcomes)
+            tester.test_results.extend(shard_test_results)
+
+        failed = outcomes.count(False)
+        print_summary(outcomes.count(True), failed)
         tester.save_test_report()
-        
-        if not success:
-            sys.exit(1)
+        success = failed == 0
+
+    if not success:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
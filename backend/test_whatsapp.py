@@ -1,4 +1,5 @@
 import asyncio
+import io
 import sys
 import os
 
@@ -12,147 +13,178 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Chrome profile kept between runs, so only the first run needs a QR scan
+SESSION_PATH = os.getenv("WHATSAPP_SESSION_PATH", os.path.expanduser("~/.wa_bot_profile"))
+
+# Output is collected here and written once per step instead of one write per
+# line; flushed before every wait so the prompts show up in time
+_output = io.StringIO()
+
+def say(*args):
+    """Queue a line of test output"""
+    print(*args, file=_output)
+
+def flush_output():
+    """Write the queued output to stdout"""
+    sys.stdout.write(_output.getvalue())
+    sys.stdout.flush()
+    _output.seek(0)
+    _output.truncate()
+
 async def test_whatsapp_integration():
     """
     Test WhatsApp integration step by step
     """
-    print("🚀 Starting WhatsApp Order Automation Test")
-    print("=" * 50)
+    say("🚀 Starting WhatsApp Order Automation Test")
+    say("=" * 50)
     
-    bot = WhatsAppBot()
+    bot = WhatsAppBot(session_path=SESSION_PATH)
     
     try:
         # Step 1: Connect to WhatsApp
-        print("\n📱 Step 1: Connecting to WhatsApp Web...")
+        say("\n📱 Step 1: Connecting to WhatsApp Web...")
+        if bot.has_session():
+            say(f"Reusing saved session in {SESSION_PATH}")
+        else:
+            say("No saved session yet; scan the QR code when Chrome opens")
+        flush_output()
         success = await bot.connect()
         
         if not success:
-            print("❌ Failed to connect to WhatsApp Web")
-            print("Please make sure:")
-            print("1. Chrome browser is installed")
-            print("2. WhatsApp Web is accessible")
-            print("3. You can scan the QR code")
+            say("❌ Failed to connect to WhatsApp Web")
+            say("Please make sure:")
+            say("1. Chrome browser is installed")
+            say("2. WhatsApp Web is accessible")
+            say("3. You can scan the QR code")
             return
         
-        print("✅ Connected to WhatsApp Web successfully!")
+        say("✅ Connected to WhatsApp Web successfully!")
         
         # Step 2: Get available groups
-        print("\n📋 Step 2: Getting available WhatsApp groups...")
+        say("\n📋 Step 2: Getting available WhatsApp groups...")
+        flush_output()
         groups = await bot.get_groups()
         
         if not groups:
-            print("❌ No WhatsApp groups found")
-            print("Please:")
-            print("1. Create a test WhatsApp group")
-            print("2. Add some contacts to the group")
-            print("3. Try again")
+            say("❌ No WhatsApp groups found")
+            say("Please:")
+            say("1. Create a test WhatsApp group")
+            say("2. Add some contacts to the group")
+            say("3. Try again")
             return
         
-        print(f"✅ Found {len(groups)} WhatsApp groups:")
+        say(f"✅ Found {len(groups)} WhatsApp groups:")
         for i, group in enumerate(groups):
-            print(f"  {i+1}. {group['name']}")
+            say(f"  {i+1}. {group['name']}")
         
         # Step 3: Select first group for testing
         if groups:
             test_group = groups[0]
-            print(f"\n🎯 Step 3: Selecting group '{test_group['name']}' for testing...")
+            say(f"\n🎯 Step 3: Selecting group '{test_group['name']}' for testing...")
             
+            flush_output()
             success = await bot.select_group(test_group['name'])
             if success:
-                print(f"✅ Successfully selected group: {test_group['name']}")
+                say(f"✅ Successfully selected group: {test_group['name']}")
             else:
-                print(f"❌ Failed to select group: {test_group['name']}")
+                say(f"❌ Failed to select group: {test_group['name']}")
                 return
         
-        # Step 4: Get recent messages
-        print("\n📨 Step 4: Getting recent messages...")
-        messages = await bot.get_messages(limit=20)
-        
-        print(f"✅ Retrieved {len(messages)} messages")
-        
-        # Step 5: Analyze messages for orders
-        print("\n🔍 Step 5: Analyzing messages for orders...")
-        order_messages = [msg for msg in messages if msg.get("is_order", False)]
-        
-        print(f"✅ Found {len(order_messages)} potential order messages:")
-        
-        for i, order_msg in enumerate(order_messages[:5]):  # Show first 5
-            print(f"\n  Order {i+1}:")
-            print(f"    From: {order_msg['sender']}")
-            print(f"    Time: {order_msg['timestamp']}")
-            print(f"    Content: {order_msg['content'][:100]}...")
-            
-            if order_msg.get('order_data'):
-                items = order_msg['order_data'].get('items', [])
-                print(f"    Extracted Items: {len(items)}")
-                for item in items:
-                    print(f"      - {item['item']}: {item['quantity']}")
-        
-        # Step 6: Test export functionality
-        print(f"\n📤 Step 6: Testing chat export...")
-        export_path = await bot.export_chat(test_group['name'], days=1)
-        
+        # Steps 4 and 5 only read the open chat, so they run together; the
+        # bot does its Selenium calls on its own threads
+        say("\n📨 Step 4: Getting recent order messages...")
+        say("📤 Step 5: Testing chat export...")
+        flush_output()
+        orders, export_path = await asyncio.gather(
+            bot.get_order_messages(limit=20),
+            bot.export_chat(test_group['name'], days=1)
+        )
+        
+        # Step 4: Recent order messages
+        # The bot classifies messages while reading them and returns only
+        # the orders, so there is no separate filtering pass here
+        say(f"\n✅ Found {len(orders)} potential order messages:")
+        
+        for i, order in enumerate(orders[:5]):  # Show first 5
+            say(f"\n  Order {i+1}:")
+            say(f"    From: {order.sender}")
+            say(f"    Time: {order.timestamp}")
+            say(f"    Content: {order.content[:100]}...")
+            say(f"    Extracted Items: {len(order.items)}")
+            for item, quantity in order.items:
+                say(f"      - {item}: {quantity}")
+        
+        # Step 5: Chat export
         if export_path:
-            print(f"✅ Chat exported successfully to: {export_path}")
+            say(f"\n✅ Chat exported successfully to: {export_path}")
         else:
-            print("❌ Failed to export chat")
-        
-        # Step 7: Instructions for testing
-        print("\n🧪 Step 7: Testing Instructions")
-        print("=" * 30)
-        print(f"Now you can test by sending order messages to '{test_group['name']}' group:")
-        print("\nExample messages to send:")
-        print("1. 'Hi, I want cotton shirt 3 pieces'")
-        print("2. 'Please book for me: formal shirt 2, jeans 1 piece'")
-        print("3. 'मुझे चाहिए कॉटन शर्ट 5 पीस'")
-        print("\nThe system will automatically:")
-        print("- Detect these as order messages")
-        print("- Extract customer and item information")
-        print("- Process them in the backend API")
+            say("\n❌ Failed to export chat")
+        
+        # Step 6: Instructions for testing
+        say("\n🧪 Step 6: Testing Instructions")
+        say("=" * 30)
+        say(f"Now you can test by sending order messages to '{test_group['name']}' group:")
+        say("\nExample messages to send:")
+        say("1. 'Hi, I want cotton shirt 3 pieces'")
+        say("2. 'Please book for me: formal shirt 2, jeans 1 piece'")
+        say("3. 'मुझे चाहिए कॉटन शर्ट 5 पीस'")
+        say("\nThe system will automatically:")
+        say("- Detect these as order messages")
+        say("- Extract customer and item information")
+        say("- Process them in the backend API")
         
         # Keep monitoring for a short time
-        print(f"\n🔄 Monitoring '{test_group['name']}' for 30 seconds...")
-        print("Send some test order messages now!")
-        
-        # Simple monitoring loop
-        start_time = asyncio.get_event_loop().time()
-        last_message_count = len(messages)
-        
-        while (asyncio.get_event_loop().time() - start_time) < 30:
-            await asyncio.sleep(2)
-            current_messages = await bot.get_messages(limit=10)
-            
-            if len(current_messages) > last_message_count:
-                new_messages = current_messages[last_message_count:]
+        say(f"\n🔄 Monitoring '{test_group['name']}' for 30 seconds...")
+        say("Send some test order messages now!")
+        
+        # The bot reports messages as they arrive; wait for them instead of
+        # re-reading the chat every few seconds
+        monitor = asyncio.create_task(bot.start_monitoring(test_group['name']))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + 30
+        
+        try:
+            while (remaining := deadline - loop.time()) > 0:
+                flush_output()
+                try:
+                    new_messages = await asyncio.wait_for(bot.wait_for_messages(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                
                 for msg in new_messages:
                     if msg.get("is_order"):
-                        print(f"\n🆕 New order detected!")
-                        print(f"   From: {msg['sender']}")
-                        print(f"   Content: {msg['content']}")
+                        say(f"\n🆕 New order detected!")
+                        say(f"   From: {msg['sender']}")
+                        say(f"   Content: {msg['content']}")
                         if msg.get('order_data'):
                             items = msg['order_data'].get('items', [])
-                            print(f"   Items: {items}")
-                
-                last_message_count = len(current_messages)
-        
-        print("\n✅ WhatsApp integration test completed successfully!")
-        print("\nNext steps:")
-        print("1. Start the FastAPI backend: python main.py")
-        print("2. Use the frontend to connect and manage orders")
-        print("3. The system is ready for production use!")
+                            say(f"   Items: {items}")
+        finally:
+            # Stop monitoring now rather than after its current wait, and let
+            # the cancellation finish before the bot is closed
+            monitor.cancel()
+            await asyncio.gather(monitor, return_exceptions=True)
+        
+        say("\n✅ WhatsApp integration test completed successfully!")
+        say("\nNext steps:")
+        say("1. Start the FastAPI backend: python main.py")
+        say("2. Use the frontend to connect and manage orders")
+        say("3. The system is ready for production use!")
         
     except Exception as e:
-        print(f"\n❌ Error during testing: {e}")
-        print("\nTroubleshooting:")
-        print("1. Make sure Chrome browser is installed")
-        print("2. Check internet connection")
-        print("3. Ensure WhatsApp Web is working in browser")
-        print("4. Try running the test again")
+        say(f"\n❌ Error during testing: {e}")
+        say("\nTroubleshooting:")
+        say("1. Make sure Chrome browser is installed")
+        say("2. Check internet connection")
+        say("3. Ensure WhatsApp Web is working in browser")
+        say("4. Try running the test again")
         
     finally:
-        print("\n🛑 Closing WhatsApp bot...")
+        say("\n🛑 Closing WhatsApp bot...")
+        flush_output()
         await bot.close()
-        print("✅ Test completed")
+        say("✅ Test completed")
+        flush_output()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Record integration test fixtures
+Runs test_integration.py against the live backend and frontend and saves
+every response under tests/fixtures, for USE_MOCK_BACKEND=1 runs
+"""
+import asyncio
+import sys
+
+from test_integration import FIXTURES_DIR, TESTS, RecordingTransport, run_tests
+
+def main():
+    """Run the integration tests once with a recording transport"""
+    results = asyncio.run(run_tests(TESTS, transport=RecordingTransport()))
+    for (test_name, _, _), (result, lines) in zip(TESTS, results):
+        print(f"\n[{test_name}]")
+        for line in lines:
+            print(line)
+    
+    print(f"\nFixtures written to {FIXTURES_DIR}")
+    return 0 if all(result for result, _ in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())